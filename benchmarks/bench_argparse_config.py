@@ -0,0 +1,105 @@
+"""
+ArgparseConfig.parse_args on synthetic parsers with 10, 100 and 1000 arguments spread over nested subparsers,
+and on a wide parser with hundreds of subcommands.
+"""
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+
+from cfg_param_wrapper import ArgparseConfig, CfgDict
+from cfg_param_wrapper.argparse_config import ParserTree
+from cfg_param_wrapper.completion import CompletionIndex, index_path
+
+
+def make_parser(n_arguments: int, depth: int = 2, width: int = 3) -> ArgumentParser:
+    """makes a parser with `n_arguments` options, split between the root and `width` subparsers per level"""
+    parsers = [ArgumentParser(prog="bench")]
+    frontier = parsers[:]
+    for _ in range(depth):
+        new_frontier = []
+        for parent in frontier:
+            subparsers = parent.add_subparsers(dest=f"command_{len(parsers)}")
+            for i in range(width):
+                child = subparsers.add_parser(f"cmd{i}")
+                new_frontier.append(child)
+                parsers.append(child)
+        frontier = new_frontier
+
+    for i in range(n_arguments):
+        parser = parsers[i % len(parsers)]
+        parser.add_argument(f"--opt{i}", type=int, default=i)
+    return parsers[0]
+
+
+def make_wide_parser(n_commands: int, n_arguments: int = 10) -> ArgumentParser:
+    """makes a parser with `n_commands` subcommands that each have their own options and a nested subcommand"""
+    parser = ArgumentParser(prog="bench")
+    subparsers = parser.add_subparsers(dest="command")
+    for i in range(n_commands):
+        child = subparsers.add_parser(f"cmd{i}")
+        for j in range(n_arguments):
+            child.add_argument(f"--opt{j}", type=int, default=j)
+        child.add_argument("--name", required=True)
+        child.add_subparsers(dest="subcommand").add_parser("run").add_argument("--verbose", action="store_true")
+    return parser
+
+
+def make_config(tmp: Path, n_arguments: int, single_pass: bool) -> ArgparseConfig:
+    path = tmp / f"argparse_{n_arguments}_{single_pass}.json"
+    cfg = CfgDict(path)
+    # options are dealt round-robin between the 13 parsers, so these are the root's options
+    cfg.update({f"opt{i}": -i for i in range(0, n_arguments, 13)})
+    cfg.save()
+    return ArgparseConfig(make_parser(n_arguments), str(path), cfg_object=cfg, single_pass=single_pass)
+
+
+def parse(config: ArgparseConfig, argv: list[str]):
+    # the tree parse reads sys.argv directly
+    sys.argv = ["bench", *argv]
+    return config.parse_args(argv)
+
+
+def complete_from_tree(config: ArgparseConfig, prefix: str) -> list[str]:
+    keys = {**ParserTree(config.parser).get_flat_defaults(), **ParserTree.flatten(CfgDict(config.file.cfg_path))}
+    return [key for key in keys if key.startswith(prefix)]
+
+
+def benchmarks(tmp: Path):
+    argv = ["cmd1", "cmd2"]
+    old_argv = sys.argv
+    try:
+        for n_arguments in (10, 100, 1000):
+            for single_pass in (False, True):
+                config = make_config(tmp, n_arguments, single_pass)
+                mode = "single_pass" if single_pass else "default"
+                yield f"parse_args_{n_arguments}_{mode}", lambda config=config: parse(config, argv)
+            yield f"construct_{n_arguments}", lambda n=n_arguments: ArgparseConfig(
+                make_parser(n), str(tmp / "construct.json")
+            )
+        for n_commands in (30, 300):
+            path = tmp / f"argparse_wide_{n_commands}.json"
+            CfgDict(path).update({"cmd1": {"name": "x", "opt0": 5}}).save()
+            config = ArgparseConfig(make_wide_parser(n_commands), str(path))
+            yield f"parse_args_{n_commands}_commands", lambda config=config: parse(config, ["cmd1", "run"])
+            yield f"construct_{n_commands}_commands", lambda n=n_commands: ArgparseConfig(
+                make_wide_parser(n), str(tmp / "construct.json")
+            )
+
+            # completing `--set cmd1.o` from the index, compared to building the tree and reading the config
+            config = ArgparseConfig(make_wide_parser(n_commands), str(path), completion=True)
+            parse(config, ["cmd1", "run"])
+            index = CompletionIndex(index_path(path))
+            yield f"complete_from_index_{n_commands}_commands", lambda index=index: index.complete(
+                ["--set", "cmd1.o"]
+            )
+            yield f"complete_from_tree_{n_commands}_commands", lambda config=config: complete_from_tree(
+                config, "cmd1.o"
+            )
+    finally:
+        sys.argv = old_argv
+
+
+if __name__ == "__main__":
+    from harness import main
+
+    main(modules=["bench_argparse_config"])
@@ -0,0 +1,73 @@
+"""Reads of a concurrent CfgDict while other threads write to it. tests/test_concurrency.py checks the invariants."""
+import threading
+import time
+from pathlib import Path
+
+from harness import self_timed
+
+from cfg_param_wrapper import CfgDict, wrap_config
+
+READERS = 8
+WRITERS = 4
+DURATION = 0.5
+
+
+def target(a: int = 0, b: int = 0, c: int = 0):
+    return a + b + c
+
+
+def stress(cfg: CfgDict, save_on_change: bool) -> float:
+    """runs the threads for DURATION seconds, and returns the average duration of a read"""
+    wrapped = wrap_config(cfg)(target)
+    cfg.save_on_change = save_on_change
+    stop = threading.Event()
+    errors: list[BaseException] = []
+    reads = [0] * READERS
+
+    def reader(idx: int):
+        try:
+            while not stop.is_set():
+                wrapped()
+                for _ in cfg.snapshot().items():
+                    pass
+                reads[idx] += 1
+        except BaseException as e:
+            errors.append(e)
+
+    def writer(idx: int):
+        try:
+            i = 0
+            while not stop.is_set():
+                cfg[f"key{idx}_{i % 100}"] = i
+                if i % 7 == 0:
+                    cfg.pop(f"key{idx}_{(i - 1) % 100}", None)
+                i += 1
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(READERS)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(WRITERS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    cfg.save_on_change = False
+    if errors:
+        raise RuntimeError(f"{len(errors)} threads failed") from errors[0]
+    return elapsed * READERS / max(1, sum(reads))
+
+
+def benchmarks(tmp: Path):
+    cfg = CfgDict(tmp / "concurrent.json", concurrent=True, config={f"key{i}": i for i in range(100)})
+    yield "read_under_writes", self_timed(lambda: stress(cfg, False))
+    yield "read_under_saving_writes", self_timed(lambda: stress(cfg, True))
+
+
+if __name__ == "__main__":
+    from harness import main
+
+    main(modules=["bench_concurrency"])
@@ -0,0 +1,76 @@
+"""
+Reading values from a frozen record compared to a dict, a CfgDict and a Namespace, and the cost of freezing,
+hashing and pickling records. Running this file also prints the memory each kind of object takes.
+"""
+import pickle
+import tracemalloc
+from argparse import Namespace
+from itertools import count
+from pathlib import Path
+
+from cfg_param_wrapper import CfgDict, freeze
+
+CONFIG = {
+    "scale": 4,
+    "name": "model",
+    "threads": 8,
+    "verbose": False,
+    "train": {"lr": 0.1, "epochs": 10, "layers": [64, 64, 32]},
+}
+
+
+def make_objects(tmp: Path) -> dict:
+    cfg = CfgDict(tmp / "frozen.json", start_empty=True)
+    cfg.update(CONFIG)
+    return {
+        "dict": dict(CONFIG),
+        "cfg_dict": cfg,
+        "namespace": Namespace(**{**CONFIG, "train": Namespace(**CONFIG["train"])}),
+        "frozen": freeze(CONFIG),
+    }
+
+
+def benchmarks(tmp: Path):
+    objects = make_objects(tmp)
+    for name in ("dict", "cfg_dict"):
+        yield f"{name}_read", lambda obj=objects[name]: (obj["scale"], obj["name"], obj["threads"], obj["verbose"])
+        yield f"{name}_read_nested", lambda obj=objects[name]: obj["train"]["lr"]
+    for name in ("namespace", "frozen"):
+        yield f"{name}_read", lambda obj=objects[name]: (obj.scale, obj.name, obj.threads, obj.verbose)
+        yield f"{name}_read_nested", lambda obj=objects[name]: obj.train.lr
+
+    frozen = objects["frozen"]
+    yield "frozen_hash", lambda: hash(frozen)
+    yield "dict_pickle", lambda: pickle.loads(pickle.dumps(CONFIG))
+    yield "frozen_pickle", lambda: pickle.loads(pickle.dumps(frozen))
+    yield "freeze", lambda: freeze(CONFIG)
+
+    cfg = objects["cfg_dict"]
+    yield "cfg_dict_freeze_unchanged", cfg.freeze
+    yield "cfg_dict_freeze_changed", lambda counter=count(): (cfg.__setitem__("scale", next(counter)), cfg.freeze())
+
+
+def memory(n: int = 10_000) -> dict[str, float]:
+    """the bytes taken by each kind of object, averaged over `n` copies"""
+    makers = {
+        "dict": lambda: {**CONFIG, "train": dict(CONFIG["train"])},
+        "namespace": lambda: Namespace(**{**CONFIG, "train": Namespace(**CONFIG["train"])}),
+        "frozen": lambda: freeze(CONFIG),
+    }
+    sizes = {}
+    for name, make in makers.items():
+        make()  # the record type is made once, outside of the measurement
+        tracemalloc.start()
+        objects = [make() for _ in range(n)]
+        sizes[name] = tracemalloc.get_traced_memory()[0] / n
+        tracemalloc.stop()
+        del objects
+    return sizes
+
+
+if __name__ == "__main__":
+    from harness import main
+
+    for name, size in memory().items():
+        print(f"frozen.memory_{name:<43} {size:12.0f} bytes")
+    main(modules=["bench_frozen"])
@@ -0,0 +1,45 @@
+"""Import time of the package, measured with `python -X importtime` in a fresh interpreter."""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from harness import self_timed
+
+STATEMENTS = {
+    "package": "import cfg_param_wrapper",
+    "cfg_dict": "import cfg_param_wrapper; cfg_param_wrapper.CfgDict",
+    "wrap_config": "import cfg_param_wrapper; cfg_param_wrapper.wrap_config",
+    "argparse_config": "import cfg_param_wrapper; cfg_param_wrapper.ArgparseConfig",
+}
+
+
+def import_time(statement: str) -> float:
+    """returns the cumulative import time of the package's modules in seconds"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    )
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        # only top level imports, the package's submodules are included in their cumulative time
+        if name.startswith(" cfg_param_wrapper"):
+            total += int(cumulative)
+    return total / 1e6
+
+
+def benchmarks(tmp: Path):
+    for name, statement in STATEMENTS.items():
+        yield name, self_timed(lambda statement=statement: import_time(statement))
+
+
+if __name__ == "__main__":
+    from harness import main
+
+    main(modules=["bench_import"])
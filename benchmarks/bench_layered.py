@@ -0,0 +1,42 @@
+"""Reading the merged values of three config files after one of them changed, compared to merging them again."""
+from itertools import count
+from pathlib import Path
+
+from bench_save_handlers import SIZES
+
+from cfg_param_wrapper import CfgDict, LayeredConfig
+from cfg_param_wrapper.argparse_config import ParserTree
+
+
+def merge(layers: list[CfgDict]) -> dict:
+    merged: dict = {}
+    for layer in layers:
+        merged.update(ParserTree.flatten(layer))
+    return merged
+
+
+def change_one_key(layer: CfgDict, read, counter) -> None:
+    layer["section0"] = {**layer["section0"], "key0": next(counter)}
+    read()
+
+
+def benchmarks(tmp: Path):
+    for size, config in SIZES.items():
+        layers = {}
+        for name in ("system", "user", "project"):
+            layers[name] = CfgDict(tmp / f"layered_{name}_{size}.json", start_empty=True)
+            layers[name].update(config)
+        layered = LayeredConfig(layers)
+        files = list(layers.values())
+        yield f"merge_again_{size}", lambda files=files, counter=count(): change_one_key(
+            files[1], lambda: merge(files), counter
+        )
+        yield f"layered_refresh_{size}", lambda layer=layers["user"], layered=layered, counter=count(): change_one_key(
+            layer, layered.refresh, counter
+        )
+
+
+if __name__ == "__main__":
+    from harness import main
+
+    main(modules=["bench_layered"])
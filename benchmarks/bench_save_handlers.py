@@ -0,0 +1,110 @@
+"""
+Load and save round-trips of small and large configs through the json and toml save handlers,
+through every json and toml codec installed for the large config,
+through the directory and sqlite handlers saving a config after one of its sections changed,
+and through a CfgDict saving every change to a key, with and without a journal.
+"""
+from itertools import count
+from pathlib import Path
+
+from cfg_param_wrapper import CfgDict
+from cfg_param_wrapper.save_handlers import (
+    DirectorySaveHandler,
+    JournalSaveHandler,
+    JsonSaveHandler,
+    SnapshotSaveHandler,
+    SqliteSaveHandler,
+    TomlSaveHandler,
+)
+
+
+def make_config(n_sections: int, n_keys: int) -> dict:
+    """a config with `n_sections` tables of `n_keys` mixed values, plus as many top level values"""
+    values = [1, 2.5, "text", True, [1, 2, 3]]
+    config = {f"key{i}": values[i % len(values)] for i in range(n_keys)}
+    for section in range(n_sections):
+        config[f"section{section}"] = {f"key{i}": values[i % len(values)] for i in range(n_keys)}
+    return config
+
+
+SIZES = {
+    "small": make_config(1, 10),
+    "large": make_config(100, 50),
+}
+
+
+def benchmarks(tmp: Path):
+    for handler_name, handler_type in (("json", JsonSaveHandler), ("toml", TomlSaveHandler)):
+        for size, config in SIZES.items():
+            handler = handler_type(tmp / f"{size}.{handler_name}")
+            handler.save(config)
+            yield f"{handler_name}_save_{size}", lambda handler=handler, config=config: handler.save(config)
+            yield f"{handler_name}_load_{size}", handler.load
+
+            snapshot_handler = SnapshotSaveHandler(handler_type(tmp / f"{size}_snapshot.{handler_name}"))
+            snapshot_handler.save(config)
+            yield f"{handler_name}_snapshot_load_{size}", snapshot_handler.load
+
+    yield from codec_benchmarks(tmp, SIZES["large"])
+
+    for size, config in SIZES.items():
+        handler = DirectorySaveHandler(tmp / f"{size}_directory")
+        handler.save(config)
+        yield f"directory_save_one_section_{size}", lambda handler=handler, config=config: save_one_section(
+            handler, config, count()
+        )
+        yield f"directory_load_{size}", handler.load
+
+        sqlite_handler = SqliteSaveHandler(tmp / f"{size}.db")
+        sqlite_handler.save(config)
+        yield f"sqlite_save_one_section_{size}", lambda handler=sqlite_handler, config=config: handler.save_changes(
+            config, ["section0"]
+        )
+        yield f"sqlite_save_{size}", lambda handler=sqlite_handler, config=config: handler.save(config)
+        yield f"sqlite_load_{size}", sqlite_handler.load
+
+        for journal in (False, True):
+            path = tmp / f"{size}_journal_{journal}.json"
+            cfg = CfgDict(path, save_on_change=True, start_empty=True, journal=journal)
+            cfg.update(config)
+            cfg.save()
+            name = "journal" if journal else "json"
+            yield f"{name}_set_one_key_{size}", lambda cfg=cfg, counter=count(): cfg.__setitem__(
+                "counter", next(counter)
+            )
+        handler = JournalSaveHandler(JsonSaveHandler(tmp / f"{size}_journal_load.json"), max_records=1000)
+        handler.save(config)
+        for i in range(999):
+            handler.save_changes({**config, "counter": i}, ["counter"])
+        yield f"journal_load_999_records_{size}", handler.load
+
+
+def codec_benchmarks(tmp: Path, config: dict):
+    handlers = {
+        "json_stdlib": JsonSaveHandler(tmp / "codec_stdlib.json", codec="json"),
+        "json_stdlib_compact": JsonSaveHandler(tmp / "codec_stdlib_compact.json", codec="json", compact=True),
+        "json_orjson": JsonSaveHandler(tmp / "codec_orjson.json", codec="orjson"),
+        "json_orjson_compact": JsonSaveHandler(tmp / "codec_orjson_compact.json", codec="orjson", compact=True),
+        "toml_toml": TomlSaveHandler(tmp / "codec_toml.toml", codec="toml"),
+        "toml_tomllib": TomlSaveHandler(tmp / "codec_tomllib.toml", codec="tomllib"),
+    }
+    for name, handler in handlers.items():
+        try:
+            handler.save(config)
+            handler.load()
+        except ImportError:  # the codec is not installed
+            continue
+        yield f"codec_{name}_save_large", lambda handler=handler: handler.save(config)
+        yield f"codec_{name}_load_large", handler.load
+
+
+def save_one_section(handler: DirectorySaveHandler, config: dict, counter) -> None:
+    config = dict(config)
+    config["section0"] = {**config["section0"], "key0": next(counter)}
+    handler.save(config)
+
+
+if __name__ == "__main__":
+    from harness import main
+
+    main(modules=["bench_save_handlers"])
@@ -0,0 +1,32 @@
+"""Starting a worker's CfgDict from shared memory compared to loading it from the file, for a large config."""
+from pathlib import Path
+
+from bench_save_handlers import SIZES
+
+from cfg_param_wrapper import CfgDict, SharedConfig
+
+
+def attach(name: str) -> CfgDict:
+    shared = SharedConfig.attach(name)
+    try:
+        return shared.cfg_dict()
+    finally:
+        shared.close()
+
+
+def benchmarks(tmp: Path):
+    for size, config in SIZES.items():
+        path = tmp / f"shared_{size}.json"
+        cfg = CfgDict(path, start_empty=True)
+        cfg.update(config)
+        cfg.save()
+        with cfg.share() as shared:
+            yield f"file_load_{size}", lambda path=path: CfgDict(path)
+            yield f"shared_attach_{size}", lambda name=shared.name: attach(name)
+            yield f"shared_refresh_unchanged_{size}", lambda shared=shared, cfg=cfg: shared.refresh(cfg)
+
+
+if __name__ == "__main__":
+    from harness import main
+
+    main(modules=["bench_shared"])
@@ -0,0 +1,51 @@
+"""The call overhead of a wrap_config wrapped function compared to a direct call, and the cost of decorating."""
+import inspect
+from pathlib import Path
+
+from cfg_param_wrapper import CfgDict, finalize_config, wrap_config
+
+
+def target(s: str = "we", num: int = 3, is_real: bool = True):
+    return s, num, is_real
+
+
+def make_command(idx: int):
+    """a function with its own parameters and parameters shared with other commands, like a CLI command"""
+
+    def command(verbose: bool = False, threads: int = 4, name: str = "", limit: int | None = None, **kwargs):
+        return idx
+
+    command.__signature__ = inspect.signature(command).replace(  # type: ignore
+        parameters=[
+            *list(inspect.signature(command).parameters.values())[:-1],
+            *(inspect.Parameter(f"opt{idx}_{i}", inspect.Parameter.KEYWORD_ONLY, default=i) for i in range(10)),
+        ]
+    )
+    return command
+
+
+COMMANDS = [make_command(idx) for idx in range(50)]
+
+
+def decorate_commands(path: Path, defer: bool):
+    cfg = CfgDict(path, start_empty=True)
+    for command in COMMANDS:
+        wrap_config(cfg, defer=defer)(command)
+    finalize_config(cfg)
+
+
+def benchmarks(tmp: Path):
+    cfg = CfgDict(tmp / "wrap_config.json")
+    wrapped = wrap_config(cfg)(target)
+
+    yield "direct", lambda: target()
+    yield "wrapped", lambda: wrapped()
+    yield "wrapped_args", lambda: wrapped("us", is_real=False)
+    yield "decorate_50", lambda: decorate_commands(tmp / "decorate.json", defer=False)
+    yield "decorate_50_deferred", lambda: decorate_commands(tmp / "decorate.json", defer=True)
+
+
+if __name__ == "__main__":
+    from harness import main
+
+    main(modules=["bench_wrap_config"])
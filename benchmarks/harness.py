@@ -0,0 +1,118 @@
+"""Runs the benchmarks in this folder and compares their results.
+
+    python benchmarks/harness.py run [-o results.json] [-k FILTER]
+    python benchmarks/harness.py compare old.json new.json [--threshold 0.1]
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+BENCHMARK_DIR = Path(__file__).parent
+MODULES = sorted(path.stem for path in BENCHMARK_DIR.glob("bench_*.py"))
+
+Benchmarks = Callable[[Path], Iterator[tuple[str, Callable[[], object]]]]
+
+
+def self_timed(func: Callable[[], float]) -> Callable[[], float]:
+    """marks a benchmark that measures itself and returns its own duration in seconds"""
+    func.self_timed = True  # type: ignore
+    return func
+
+
+def measure(func: Callable[[], object], repeat: int = 5, min_time: float = 0.2) -> dict[str, float | int]:
+    """times a function, returning statistics in seconds per call"""
+    if getattr(func, "self_timed", False):
+        number = 1
+        times: list[float] = [func() for _ in range(repeat)]  # type: ignore
+    else:
+        timer = timeit.Timer(func)
+        number, _ = timer.autorange()
+        number = max(1, int(number * min_time / 0.2))
+        times = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def run(modules: list[str], pattern: str | None = None) -> dict:
+    results = {}
+    sys.path.insert(0, str(BENCHMARK_DIR))
+    for module_name in modules:
+        module = importlib.import_module(module_name)
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, func in module.benchmarks(Path(tmp)):
+                full_name = f"{module_name.removeprefix('bench_')}.{name}"
+                if pattern and pattern not in full_name:
+                    continue
+                results[full_name] = stats = measure(func)
+                print(f"{full_name:<50} {stats['median'] * 1e6:12.2f} us", file=sys.stderr)
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.time(),
+        "results": results,
+    }
+
+
+def compare(old: dict, new: dict, threshold: float) -> list[str]:
+    """prints the change of every benchmark in both runs and returns the names of the regressed ones"""
+    regressions = []
+    for name, new_stats in new["results"].items():
+        if name not in old["results"]:
+            continue
+        ratio = new_stats["median"] / old["results"][name]["median"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "improvement"
+        print(f"{name:<50} {ratio:8.2f}x {flag}")
+    return regressions
+
+
+def main(argv: list[str] | None = None, modules: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="cfg_param_wrapper benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="runs the benchmarks")
+    run_parser.add_argument("-o", "--output", type=Path, help="where to write the results as json")
+    run_parser.add_argument("-k", "--filter", help="only runs benchmarks containing this string")
+    compare_parser = commands.add_parser("compare", help="flags regressions between two runs")
+    compare_parser.add_argument("old", type=Path)
+    compare_parser.add_argument("new", type=Path)
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown, by default 0.1")
+    if argv is None and modules:
+        # running a single benchmark module directly
+        argv = ["run", *sys.argv[1:]]
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        old = json.loads(args.old.read_text())
+        new = json.loads(args.new.read_text())
+        return 1 if compare(old, new, args.threshold) else 0
+
+    results = run(modules or MODULES, args.filter)
+    output = json.dumps(results, indent=4)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,56 @@
 """A Config parser library meant for easy plug and play."""
-from .argparse_config import ArgparseConfig
-from .cfg_dict import CfgDict
-from .function_config_wrapper import wrap_config
+from __future__ import annotations
 
-ConfigArgParser = ArgparseConfig  # for compat
-__all__: list[str] = ["ConfigArgParser", "ArgparseConfig", "CfgDict", "wrap_config"]
+import importlib
+
+# `typing` alone takes longer to import than this package, so it is not used here
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from .argparse_config import ArgparseConfig
+    from .cfg_dict import CfgDict
+    from .frozen import FrozenConfig, freeze
+    from .function_config_wrapper import finalize_config, wrap_config
+    from .layered import LayeredConfig
+    from .shared import SharedConfig
+    from .watcher import ConfigWatcher
+
+    ConfigArgParser = ArgparseConfig
+
+# the submodules are only imported once their attributes are used, to keep the import time low
+_LAZY_ATTRIBUTES: dict[str, tuple[str, str]] = {
+    "ArgparseConfig": (".argparse_config", "ArgparseConfig"),
+    "ConfigArgParser": (".argparse_config", "ArgparseConfig"),  # for compat
+    "CfgDict": (".cfg_dict", "CfgDict"),
+    "wrap_config": (".function_config_wrapper", "wrap_config"),
+    "finalize_config": (".function_config_wrapper", "finalize_config"),
+    "ConfigWatcher": (".watcher", "ConfigWatcher"),
+    "SharedConfig": (".shared", "SharedConfig"),
+    "LayeredConfig": (".layered", "LayeredConfig"),
+    "FrozenConfig": (".frozen", "FrozenConfig"),
+    "freeze": (".frozen", "freeze"),
+}
+__all__: list[str] = [
+    "ConfigArgParser",
+    "ArgparseConfig",
+    "CfgDict",
+    "wrap_config",
+    "finalize_config",
+    "ConfigWatcher",
+    "SharedConfig",
+    "LayeredConfig",
+    "FrozenConfig",
+    "freeze",
+]
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attribute = _LAZY_ATTRIBUTES[name]
+    value = getattr(importlib.import_module(module_name, __name__), attribute)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
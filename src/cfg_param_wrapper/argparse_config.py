@@ -1,7 +1,16 @@
-from argparse import ArgumentParser, Namespace
+from __future__ import annotations
+
+import sys
+from argparse import REMAINDER, Action, ArgumentParser, ArgumentTypeError, Namespace, _get_action_name
+from collections.abc import Callable, Iterator, Mapping
+from pathlib import Path
 from sys import exit as sys_exit
+from typing import Any
 
 from .cfg_dict import CfgDict
+from .instrumentation import timer
+from .layered import LayeredConfig
+from .save_handlers import HANDLERS
 
 
 class ParserTree(dict):
@@ -9,6 +18,14 @@ class ParserTree(dict):
         super().__init__()
         self.parser = argparser
         self.update(ParserTree.parser_to_tree(argparser))
+        # maps the dotted key of every action (e.g. `sub.subsub.dest`) to the action, for the subtrees built so far
+        self.index: dict[str, Action] = ParserTree.index_tree(self)
+        if "subparsers" in self:
+            self["subparsers"]["choices"].tree = self
+        # the tree and choice this tree was built for, which are told about subtrees built below this one
+        self._built_for: tuple[ParserTree, str] | None = None
+        # converters of the config values of each key, compiled when a key is first set
+        self.converters: dict[str, Callable[[Any], Any]] = {}
 
     @staticmethod
     def parser_to_tree(argparser: ArgumentParser):
@@ -26,23 +43,93 @@ class ParserTree(dict):
 
         subparser = ParserTree.get_subparsers(argparser)
         if subparser:
-            # make a new key dict that represents the parser's subparser and choices in a sub-ParserTree
+            # make a new key dict that represents the parser's subparser and choices in a sub-ParserTree.
+            # the sub-ParserTrees are only built once they are used
             new["subparsers"] = {
                 "group": subparser,
-                "choices": {dest: ParserTree(parser) for dest, parser in subparser.choices.items()},
+                "choices": LazyChoices(subparser.choices),
             }
 
         return new
 
+    @staticmethod
+    def index_tree(parser_tree) -> dict[str, Action]:
+        index = {}
+        if "actions" in parser_tree:
+            index.update(parser_tree["actions"])
+        if "subparsers" in parser_tree:
+            for dest, subtree in parser_tree["subparsers"]["choices"].built.items():
+                index.update({f"{dest}.{key}": action for key, action in subtree.index.items()})
+        return index
+
+    def _add_subtree(self, dest: str, subtree: ParserTree) -> None:
+        """adds the actions of a newly built subtree to the index of this tree and the trees above it"""
+        subtree._built_for = (self, dest)
+        entries = subtree.index
+        tree: ParserTree | None = subtree
+        while tree is not None and tree._built_for is not None:
+            parent, dest = tree._built_for
+            entries = {f"{dest}.{key}": action for key, action in entries.items()}
+            parent.index.update(entries)
+            tree = parent
+
+    def find(self, key: str) -> Action | None:
+        """returns the action of a dotted key, building the subtrees on its path, or None if there is none"""
+        if key in self.index:
+            return self.index[key]
+        tree = self
+        dests = key.split(".")
+        for dest in dests[:-1]:
+            if "subparsers" not in tree or dest not in tree["subparsers"]["choices"]:
+                return None
+            tree = tree["subparsers"]["choices"][dest]
+        return self.index.get(key)
+
+    def select(self, args) -> None:
+        """builds the subtrees of the subcommands named in the arguments, and of default subcommands"""
+        ParserTree._select(self, set(args))
+
+    @staticmethod
+    def _select(tree: ParserTree, tokens: set) -> None:
+        if "subparsers" in tree:
+            choices = tree["subparsers"]["choices"]
+            default = tree["subparsers"]["group"].default
+            for dest in tokens.intersection(choices.parsers):
+                ParserTree._select(choices[dest], tokens)
+            if default in choices:
+                ParserTree._select(choices[default], tokens)
+
+    def build_all(self) -> ParserTree:
+        """builds every subtree"""
+        if "subparsers" in self:
+            for subtree in self["subparsers"]["choices"].values():
+                subtree.build_all()
+        return self
+
     def get_defaults(self):
         return ParserTree.defaults_from_tree(self)
 
+    def get_flat_defaults(self) -> dict:
+        """the same as `ParserTree.flatten(self.get_defaults())`, read from the index"""
+        return {key: action.default for key, action in self.build_all().index.items()}
+
     def update_from_flattened(self, flattened):
-        ParserTree.update_from_flattened_recurs(self, flattened)
+        index = self.index
+        for key, item in flattened.items():
+            action = index[key] if key in index else self.find(key)
+            if action is not None:
+                action.default = item
 
     def disable_required(self):
-        # returns a partial tree representing all of the actions that don't have a default
-        return ParserTree._disable_required_with_defaults(self)
+        # returns a partial tree representing all of the actions that don't have a default.
+        # only built subtrees are included, as the others are not parsed
+        still_required = {}
+        for key, action in self.index.items():
+            if action.required:
+                if not action.default:
+                    still_required[key] = action
+                action.required = False
+        return {"actions": still_required} if still_required else {}
 
     def parse(self):
         # Main issue is that it doesn't take in account bad arguments
@@ -54,6 +141,89 @@ class ParserTree(dict):
                 return self.combine_namespaces(known, self["subparsers"]["choices"][subparser.default].parse())
         return known
 
+    def convert(self, key: str, value):
+        """converts and validates a config value for a dotted key, raising ValueError if it is invalid"""
+        if key not in self.converters:
+            self.converters[key] = ParserTree.compile_converter(self.find(key))
+        try:
+            return self.converters[key](value)
+        except (TypeError, ArgumentTypeError) as e:
+            raise ValueError(str(e)) from e
+
+    @staticmethod
+    def compile_converter(action: Action) -> Callable[[Any], Any]:
+        """
+        makes a function converting config values to what the action would produce, using its `type` and `choices`.
+        Strings are converted, other values (e.g. from a json file) are only validated.
+        """
+        if action.nargs == 0:
+            # flags like store_true don't take a value, so they are set with a boolean
+            def convert_one(value):
+                if isinstance(value, str):
+                    if value.lower() not in _BOOLEANS:
+                        raise ValueError(f"expected a boolean, got {value!r}")
+                    return _BOOLEANS[value.lower()]
+                return value
+
+        elif callable(action.type):
+            type_func = action.type
+
+            def convert_one(value):
+                return type_func(value) if isinstance(value, str) else value
+
+        else:
+            convert_one = _convert_value
+
+        choices = action.choices
+        many = action.nargs in ("*", "+", REMAINDER) or (isinstance(action.nargs, int) and action.nargs > 1)
+
+        def check(value):
+            if choices is not None and value not in choices:
+                raise ValueError(f"invalid choice: {value!r} (choose from {', '.join(map(repr, choices))})")
+            return value
+
+        if many:
+
+            def convert(value):
+                values = value.split(",") if isinstance(value, str) else value
+                return [check(convert_one(v)) for v in values]
+
+        else:
+
+            def convert(value):
+                return check(convert_one(value))
+
+        return convert
+
+    def owner(self, key: str) -> ArgumentParser:
+        """returns the parser that owns the action of a dotted key"""
+        tree = self
+        for dest in key.split(".")[:-1]:
+            tree = tree["subparsers"]["choices"][dest]
+        return tree["parent"]
+
+    def fill_default_subparsers(self, namespace: Namespace) -> Namespace:
+        """adds the defaults of default subparsers that were not selected, like `parse` does"""
+        if "subparsers" in self:
+            subparser = self["subparsers"]["group"]
+            if subparser.default and subparser.default in self["subparsers"]["choices"]:
+                subtree = self["subparsers"]["choices"][subparser.default]
+                actions = subtree.get("actions", {}).values()
+                if not all(hasattr(namespace, action.dest) for action in actions):
+                    # when no subcommand was given, the default one has to get its required arguments from the config
+                    if getattr(namespace, subparser.dest, None) == subparser.default:
+                        missing = [action for action in actions if action.required and not action.default]
+                        if missing:
+                            names = ", ".join(map(str, map(_get_action_name, missing)))
+                            subtree["parent"].error(f"the following arguments are required: {names}")
+                    for action in actions:
+                        default = action.default
+                        if isinstance(default, str):
+                            default = subtree["parent"]._get_value(action, default)
+                        setattr(namespace, action.dest, default)
+                subtree.fill_default_subparsers(namespace)
+        return namespace
+
     @staticmethod
     def combine_namespaces(*namespaces: Namespace):
         dct = {}
@@ -106,28 +276,6 @@ class ParserTree(dict):
                 if "actions" in original and key in original["actions"]:
                     original["actions"][key].default = item
 
-    @staticmethod
-    def _disable_required_with_defaults(subtree):
-        still_required = {}
-        if "actions" in subtree:
-            for dest, action in subtree["actions"].items():
-                if action.required:
-                    if action.default:
-                        action.required = False
-                    else:
-                        if "actions" not in still_required:
-                            still_required["actions"] = {}
-                        still_required["actions"][dest] = action
-                        action.required = False
-        if "subparsers" in subtree:
-            still_required["subparsers"] = {"choices": {}}
-            for dest, subtree in subtree["subparsers"]["choices"].items():
-                out = subtree.disable_required()
-                if out:
-                    still_required["subparsers"]["choices"].update({dest: out})
-
-        return still_required
-
     @staticmethod
     def reenable_required(required):
         if "actions" in required:
@@ -145,6 +293,46 @@ class ParserTree(dict):
     #         return self.subparsers[key[0]][key[1:]]
 
 
+class LazyChoices(Mapping):
+    """the sub-ParserTrees of a subparser's choices, each built when it is first accessed"""
+
+    def __init__(self, parsers: Mapping[str, ArgumentParser]):
+        self.parsers: Mapping[str, ArgumentParser] = parsers
+        self.built: dict[str, ParserTree] = {}
+        # the tree these choices belong to, which indexes the subtrees built
+        self.tree: ParserTree | None = None
+
+    def __getitem__(self, dest: str) -> ParserTree:
+        if dest not in self.built:
+            subtree = self.built[dest] = ParserTree(self.parsers[dest])
+            if self.tree is not None:
+                self.tree._add_subtree(dest, subtree)
+        return self.built[dest]
+
+    def __contains__(self, dest) -> bool:
+        return dest in self.parsers
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.parsers)
+
+    def __len__(self) -> int:
+        return len(self.parsers)
+
+
+_MISSING = object()
+_BOOLEANS = {"true": True, "false": False, "yes": True, "no": False, "1": True, "0": False}
+
+
+def _convert_value(value):
+    """the conversion for actions without a type: booleans, None and integers"""
+    if not isinstance(value, str):
+        return value
+    value = {"true": True, "false": False, "none": None, "null": None}.get(value.lower(), value)
+    if str(value).isdigit():
+        value = int(value)
+    return value
+
+
 def update_from_flattened(original, flattened):
     for key, value in flattened.items():
         if "." in key:
@@ -152,10 +340,22 @@ def update_from_flattened(original, flattened):
             if key not in original:
                 original[key] = {}
             update_from_flattened(original[key], {future: value})
+            # reassigned, so a CfgDict notices the change to the nested dict
+            original[key] = original[key]
         else:
             original[key] = value
 
 
+def pop_from_flattened(original, key):
+    if "." in key:
+        key, future = key.split(".", 1)
+        if isinstance(original.get(key), dict):
+            pop_from_flattened(original[key], future)
+            original[key] = original[key]
+    elif key in original:
+        del original[key]
+
+
 class ArgparseConfig:
     """an easy argparse config utility. It saves given args to a json, and returns them when args are parsed again."""
 
@@ -166,6 +366,9 @@ class ArgparseConfig:
         cfg_object: CfgDict | None = None,
         exit_on_change: bool = False,
         argument_group_name: str = "Config options",
+        single_pass: bool = False,
+        layers: LayeredConfig | None = None,
+        completion: bool = False,
     ):
         """Constructs a parser wrapper.
 
@@ -181,6 +384,15 @@ class ArgparseConfig:
             exits when set, reset, or reset_all is called, by default False
         argument_group_name : str, optional
             name of the argument group, by default "Config options"
+        single_pass : bool, optional
+            parses the arguments once instead of once per step, by default False
+        layers : LayeredConfig, optional
+            other config files and environment variables to read defaults from, by default None.
+            The config file is added as the "config" layer if it is not one of them, and --set only changes it.
+        completion : bool, optional
+            keeps an index of the config keys next to the config file (`<config>.complete`),
+            which shell completion of --set and --reset reads, by default False
+
 
         """
 
@@ -188,7 +400,11 @@ class ArgparseConfig:
         self.parser = parser
         self.default_prefix = self.parser.prefix_chars[0]
         self.exit_on_change = exit_on_change
+        self.single_pass = single_pass
         self.file = cfg_object or CfgDict(config_path)
+        self.layers = layers
+        if layers is not None and not any(layer is self.file for layer in layers.layers.values()):
+            layers.add_layer("config", self.file)
 
         # Add config options
         self.config_option_group = self.parser.add_argument_group(argument_group_name)
@@ -196,8 +412,15 @@ class ArgparseConfig:
         self.config_options.add_argument(
             self.default_prefix * 2 + "set",
             nargs=2,
+            action="append",
             metavar=("KEY", "VAL"),
-            help="change a default argument's options",
+            help="change a default argument's options. Can be given multiple times",
+        )
+        self.config_options.add_argument(
+            self.default_prefix * 2 + "set_from",
+            metavar="FILE",
+            type=Path,
+            help="change the options given in a json or toml file",
         )
         self.config_options.add_argument(
             self.default_prefix * 2 + "reset",
@@ -214,59 +437,184 @@ class ArgparseConfig:
         # get defaults from the actions
         self.parser_tree = ParserTree(self.parser)
 
+        self.completion = completion
+        # the signature and original defaults of the parser, described before the config changes the defaults
+        self._completion_description: tuple[str, dict] | None = None
+
     def parse_args(self, *args, **kwargs) -> Namespace:
         """args.set, reset, reset_all logic. Also a passthrough for parser.parse_args."""
+        with timer("parse_args"):
+            if self.single_pass:
+                return self._parse_args_once(*args, **kwargs)
+            return self._parse_args(*args, **kwargs)
 
+    def _load(self) -> None:
         self.file.load()
+        if self.layers is not None:
+            self.layers.load()
+        if self.completion:
+            self._update_completion_index()
+
+    def _update_completion_index(self) -> None:
+        """rewrites the completion index if the parser or the config file changed since it was written"""
+        from .completion import CompletionIndex, describe_parser, index_path
+
+        if self._completion_description is None:
+            self._completion_description = describe_parser(self.parser, self.config_options._group_actions)
+        signature, entries = self._completion_description
+        index = CompletionIndex(index_path(self.file.cfg_path))
+        stat = self.file.save_handler.file_stat()
+        if not index.is_current(signature, stat):
+            options = (self.default_prefix * 2 + "set", self.default_prefix * 2 + "reset")
+            index.write(signature, stat, entries, self._flat_config(), self.parser.prog, options)
+
+    def _flat_config(self) -> dict:
+        """the flattened config file, or the merged layers with the environment's strings converted"""
+        if self.layers is None:
+            return ParserTree.flatten(self.file)
+        flat = self.layers.flat
+        converted = {}
+        for key in self.layers.keys_from(self.layers.ENV):
+            action = self.parser_tree.find(key)
+            # the strings of actions without a type stay as they are, like argparse keeps them
+            if action is None or (action.type is None and action.nargs != 0):
+                continue
+            try:
+                converted[key] = self.parser_tree.convert(key, flat[key])
+            except ValueError as e:
+                sys_exit(f"Invalid value for {key}: {e}")
+        if converted:
+            flat = {**flat, **converted}
+        return flat
+
+    def _parse_args(self, *args, **kwargs) -> Namespace:
+        with timer("parse_args.load"):
+            self._load()
 
         # Add subparsers to the dict so it can be configured
-        self.parser_tree.update_from_flattened(ParserTree.flatten(self.file))
-
-        # disable every required item that wasn in the file
-        still_required = self.parser_tree.disable_required()
-
-        parsed_args, _ = self.parser.parse_known_args(*args, **kwargs)
+        with timer("parse_args.tree_update"):
+            self._select_subcommands(args[0] if args else kwargs.get("args"))
+            self.parser_tree.update_from_flattened(self._flat_config())
 
-        flattened_kwargs = ParserTree.flatten(self.parser_tree.get_defaults())
+            # disable every required item that wasn in the file
+            still_required = self.parser_tree.disable_required()
 
-        # TODO: make set, reset, and reset_all work for subparsers
-        # set defaults
-        if parsed_args.set or parsed_args.reset or parsed_args.reset_all:
-            if parsed_args.set:
-                potential_args = parsed_args.set
-                # convert potential_args to respective types
-                potential_args = self._convert_type(potential_args)
-                if not potential_args[0] in flattened_kwargs:
-                    sys_exit("Given key not found")
+        with timer("parse_args.parse"):
+            parsed_args, _ = self.parser.parse_known_args(*args, **kwargs)
 
-                update_from_flattened(self.file, {potential_args[0]: potential_args[1]})
+        with timer("parse_args.config_options"):
+            if self._apply_config_options(parsed_args):
+                # edit defaults
+                self.parser_tree.update_from_flattened(self._flat_config())
 
-            elif parsed_args.reset:
-                for arg in parsed_args.reset:
-                    self._pop_from_flattened(self.file, arg)
+        # reenable every required item except for the ones with defaults
+        with timer("parse_args.reenable_required"):
+            ParserTree.reenable_required(still_required)
 
-            elif parsed_args.reset_all:
-                self.file.clear()
+        # sys_exit()
+        with timer("parse_args.parse"):
+            self.parser.parse_args(*args, **kwargs)
+
+        with timer("parse_args.namespace"):
+            return self.parser_tree.parse()
+
+    def _parse_args_once(self, args=None, namespace=None) -> Namespace:
+        """The same as the regular parse_args, but argv is only parsed once unless the config was changed."""
+        with timer("parse_args.load"):
+            self._load()
+        with timer("parse_args.tree_update"):
+            self._select_subcommands(args)
+            self.parser_tree.update_from_flattened(self._flat_config())
+            still_required = self.parser_tree.disable_required()
+
+        # missing required actions are recognized by keeping a sentinel as their default
+        missing = still_required.get("actions", {})
+        defaults = {key: action.default for key, action in missing.items()}
+        for action in missing.values():
+            action.default = _MISSING
+        try:
+            with timer("parse_args.parse"):
+                parsed_args, extras = self.parser.parse_known_args(args, namespace)
+        finally:
+            for key, action in missing.items():
+                action.default = defaults[key]
+
+        with timer("parse_args.config_options"):
+            changed = self._apply_config_options(parsed_args)
+        if changed:
+            # the namespace was filled with the old defaults, so it has to be parsed again
+            self.parser_tree.update_from_flattened(self._flat_config())
+            ParserTree.reenable_required(still_required)
+            self.parser.parse_args(args, namespace)
+            return self.parser_tree.parse()
+
+        with timer("parse_args.reenable_required"):
+            ParserTree.reenable_required(still_required)
+
+        # subparsers report their missing arguments before their parents
+        for key in sorted(missing, key=lambda key: key.count("."), reverse=True):
+            if getattr(parsed_args, missing[key].dest, None) is _MISSING:
+                owner = self.parser_tree.owner(key)
+                names = [
+                    _get_action_name(action)
+                    for k, action in missing.items()
+                    if self.parser_tree.owner(k) is owner and getattr(parsed_args, action.dest, None) is _MISSING
+                ]
+                owner.error(f"the following arguments are required: {', '.join(map(str, names))}")
+        if extras:
+            self.parser.error(f"unrecognized arguments: {' '.join(extras)}")
+
+        with timer("parse_args.namespace"):
+            return self.parser_tree.fill_default_subparsers(parsed_args)
+
+    def _select_subcommands(self, args) -> None:
+        """builds the parts of the parser tree used by the arguments, the rest is only built when its keys are used"""
+        self.parser_tree.select(sys.argv[1:] if args is None else args)
+
+    def _apply_config_options(self, parsed_args: Namespace) -> bool:
+        """applies --set, --set_from, --reset and --reset_all to the file, and returns whether any of them were given"""
+        if parsed_args.set or parsed_args.set_from or parsed_args.reset or parsed_args.reset_all:
+            # every change is saved at once, and none of them are kept if one is invalid
+            save_on_change, self.file.save_on_change = self.file.save_on_change, False
+            try:
+                with self.file.batch():
+                    if parsed_args.set or parsed_args.set_from:
+                        changes = self._read_set_from(parsed_args.set_from) if parsed_args.set_from else {}
+                        changes.update(parsed_args.set or [])
+                        for key, value in changes.items():
+                            if self.parser_tree.find(key) is None:
+                                sys_exit(f"Given key not found: {key}")
+                            try:
+                                converted = self.parser_tree.convert(key, value)
+                            except ValueError as e:
+                                sys_exit(f"Invalid value for {key}: {e}")
+                            # values the file can't hold (e.g. a Path) are kept as given, and converted when parsed
+                            if self.file.is_serializable(converted):
+                                value = converted
+                            update_from_flattened(self.file, {key: value})
+
+                    elif parsed_args.reset:
+                        for arg in parsed_args.reset:
+                            pop_from_flattened(self.file, arg)
+
+                    elif parsed_args.reset_all:
+                        self.file.clear()
+            finally:
+                self.file.save_on_change = save_on_change
             self.file.save().load()
+            if self.completion:
+                self._update_completion_index()
 
             if self.exit_on_change:
                 sys_exit()
-
-        # edit defaults
-        self.parser_tree.update_from_flattened(ParserTree.flatten(self.file))
-
-        # reenable every required item except for the ones with defaults
-        ParserTree.reenable_required(still_required)
-
-        # sys_exit()
-        self.parser.parse_args(*args, **kwargs)
-
-        return self.parser_tree.parse()
+            return True
+        return False
 
     @staticmethod
-    def _convert_type(potential_args: list) -> list:
-        arg_replacements = {"true": True, "false": False, "none": None, "null": None}
-        potential_args[1] = arg_replacements.get(potential_args[1].lower(), potential_args[1])
-        if str(potential_args[1]).isdigit():
-            potential_args[1] = int(potential_args[1])
-        return potential_args
+    def _read_set_from(path: Path) -> dict:
+        """reads the flattened options of a json or toml file"""
+        handler = HANDLERS["toml" if path.suffix == ".toml" else "json"](path)
+        try:
+            return ParserTree.flatten(handler.load())
+        except Exception as e:
+            sys_exit(f"failed to read {path}: {e}")
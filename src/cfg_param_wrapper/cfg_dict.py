@@ -1,11 +1,27 @@
 """A dictionary subclass used for fast dictionary json usage."""
+from __future__ import annotations
 
 import os
+import threading
+from contextlib import contextmanager, nullcontext
+from copy import deepcopy
 from enum import Enum
 from pathlib import Path
-from typing import Any, Literal
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Literal
 
-from .save_handlers import HANDLERS, SaveHandler
+from .instrumentation import timer
+from .save_handlers import HANDLERS, JournalSaveHandler, SaveHandler, SnapshotSaveHandler
+
+if TYPE_CHECKING:
+    import asyncio
+
+    from .debounced_writer import DebouncedWriter
+    from .frozen import FrozenConfig
+    from .shared import SharedConfig
+    from .watcher import Callback, ConfigWatcher
+
+_NO_LOCK = nullcontext()
 
 
 class CfgDict(dict):
@@ -22,74 +38,471 @@ class CfgDict(dict):
         save_on_change: bool = False,
         sort_on_save: bool = False,
         start_empty: bool = False,
-        save_mode: Literal["json", "toml"] = "json",
+        save_mode: Literal["json", "toml", "directory", "sqlite"] | SaveHandler = "json",
         encoder=None,
         decoder=None,
+        writer: Literal["sync", "debounced"] = "sync",
+        debounce_delay: float = 0.5,
+        debounce_max_delay: float = 5.0,
+        snapshot: bool = False,
+        locked: bool = False,
+        concurrent: bool = False,
+        journal: bool = False,
     ) -> None:
         config = config or {}
         super().__init__(config)
+        self._version: int = 0
+        # the version each top-level key last changed at, since the version at which any key may have changed
+        self._key_versions: dict = {}
+        self._unknown_version: int = 0
+        self._batch_depth: int = 0
+        self._batch_pending: bool = False
+        # the version that matches the file's contents, used to skip loading an unchanged file
+        self._synced_version: int | None = None
+        # keys changed since the file was last loaded or saved, and whether the dict was cleared since
+        self._dirty: set = set()
+        self._cleared: bool = False
+        # whether the file held exactly the dict's contents when they were synced, so saving the dirty keys is enough
+        self._file_complete: bool = False
+
+        # writers take a lock and publish a read-only copy, which readers use without locking
+        self.concurrent: bool = concurrent
+        self._lock = threading.RLock() if concurrent else _NO_LOCK
+        self._save_lock = threading.RLock() if concurrent else _NO_LOCK
+        self._snapshot: MappingProxyType = MappingProxyType(dict(self) if concurrent else {})
+
+        # the version and the record last returned by `freeze`
+        self._frozen: tuple[int, FrozenConfig] | None = None
+
+        # the running and the queued save of `asave`
+        self._asave_current: asyncio.Future | None = None
+        self._asave_next: asyncio.Future | None = None
         self.cfg_path: str | Path = cfg_path
         self.save_on_change: bool = save_on_change
         self.sort_on_save: bool = sort_on_save
 
-        assert save_mode in HANDLERS
-        self.save_handler: SaveHandler = HANDLERS[save_mode](cfg_path)
+        if isinstance(save_mode, SaveHandler):
+            self.save_handler: SaveHandler = save_mode
+        else:
+            assert save_mode in HANDLERS
+            self.save_handler = HANDLERS[save_mode](cfg_path)
+        if snapshot:
+            self.save_handler = SnapshotSaveHandler(self.save_handler, decoder)
+        # appends the changed keys to a journal, wrapped around the snapshot so it is only rewritten when compacting
+        if journal:
+            self.save_handler = JournalSaveHandler(self.save_handler)
+
+        # locks the file while loading and saving, and merges the changed keys into the file when saving
+        self.locked: bool = locked
+        if locked or concurrent:
+            self.save_handler.atomic = True
         self.encoder = encoder
         self.decoder = decoder
+        # whether instances of non-container types can be serialized, as they all serialize the same way
+        self._serializable_types: dict[type, bool] = {}
+
+        assert writer in ("sync", "debounced")
+        self._writer: DebouncedWriter | None = None
+        if writer == "debounced":
+            from .debounced_writer import DebouncedWriter
+
+            self.save_handler.atomic = True
+            self._writer = DebouncedWriter(self, debounce_delay, debounce_max_delay)
+
         if not os.path.exists(self.cfg_path) and autofill:
             self.save(config)
         if not start_empty:
             self.load()
 
+    @property
+    def version(self) -> int:
+        """a counter that increases every time the contents of the dict change"""
+        return self._version
+
+    def snapshot(self):
+        """
+        returns the contents as a read-only mapping that is safe to read while other threads write.
+        Only available for concurrent dicts, the dict itself is returned otherwise.
+        """
+        if self.concurrent:
+            return self._snapshot
+        return self
+
+    def freeze(self) -> FrozenConfig:
+        """
+        returns a read-only record of the contents, which is hashable and cheap to pickle.
+        The same record is returned until the contents change
+        """
+        frozen = self._frozen
+        if frozen is not None and frozen[0] == self._version:
+            return frozen[1]
+        from .frozen import freeze
+
+        with self._lock:
+            frozen = self._frozen = (self._version, freeze(self.snapshot()))
+        return frozen[1]
+
+    def _changed(self, keys=None, dirty: bool = True) -> None:
+        # the snapshot is published before the version, so a reader never pairs a new version with an old snapshot
+        if self.concurrent:
+            self._snapshot = MappingProxyType(dict(self))
+        version = self._version + 1
+        if keys is None:
+            self._key_versions.clear()
+            self._unknown_version = version
+        else:
+            key_versions = self._key_versions
+            for key in keys:
+                key_versions[key] = version
+            if dirty:
+                self._dirty.update(keys)
+        self._version = version
+
+    def changed_since(self, version: int) -> set | None:
+        """the top-level keys changed after a version, or None if any key may have changed"""
+        with self._lock:
+            if version < self._unknown_version:
+                return None
+            return {key for key, changed in self._key_versions.items() if changed > version}
+
     def set_path(self, path):
         """sets a new path to follow"""
         self.cfg_path = path
         self.save_handler.path = path
         return self
 
-    def save(self, out_dict=None):
-        """saves the dict to the file"""
-        if not isinstance(out_dict, dict):
-            out_dict = self
-        if self.sort_on_save:
-            out_dict = dict(sorted(out_dict.items()))
-        self.save_handler.save(dict(out_dict), self.encoder)
+    def save(self, out_dict=None, changes_only: bool = False):
+        """
+        saves the dict to the file. With `changes_only`, only the keys changed since the file was synced are written,
+        if the save handler supports it and the file was not changed by something else
+        """
+        with timer("CfgDict.save"):
+            return self._save(out_dict, changes_only)
+
+    def _save(self, out_dict, changes_only: bool = False):
+        synced = not isinstance(out_dict, dict) or out_dict is self
+        if synced and self.locked:
+            return self._save_merged()
+        with self._save_lock:
+            partial = False
+            if synced:
+                with self._lock:
+                    version = self._version
+                    out_dict = self.snapshot()
+                    dirty, self._dirty = self._dirty, set()
+                    cleared, self._cleared = self._cleared, False
+                keys = dirty
+                if changes_only and not cleared and self.save_handler.merges_changes:
+                    # the changed keys are written over whatever the file holds, so changes by others are kept
+                    partial = True
+                    if not self._file_complete:
+                        keys = dirty | set(out_dict)
+                else:
+                    partial = (
+                        changes_only
+                        and self._file_complete
+                        and not cleared
+                        and self._synced_version is not None
+                        and self.save_handler.unchanged()
+                    )
+            if self.sort_on_save:
+                out_dict = dict(sorted(out_dict.items()))
+            self._synced_version = None
+            self._file_complete = False
+            try:
+                if partial:
+                    self.save_handler.save_changes(dict(out_dict), keys, self.encoder)
+                else:
+                    self.save_handler.save(dict(out_dict), self.encoder)
+            except BaseException:
+                if synced:
+                    self._dirty |= dirty
+                    self._cleared |= cleared
+                raise
+            if synced:
+                self._synced_version = version
+                self._file_complete = True
+        return self
+
+    def _save_merged(self):
+        """
+        saves only the keys changed by this dict on top of the file's current contents, under an exclusive lock.
+        Changes made to the file by other processes are adopted afterwards.
+        """
+        handler = self.save_handler
+        with self._save_lock:
+            with self._lock:
+                contents = dict(self.snapshot())
+                dirty, self._dirty = self._dirty, set()
+                cleared, self._cleared = self._cleared, False
+            try:
+                with handler.lock(exclusive=True):
+                    if cleared or handler.unchanged() or handler.file_stat() is None:
+                        # nothing but this dict changed the file since it was synced
+                        merged = contents
+                    else:
+                        merged = handler.load(self.decoder)
+                        for key in dirty:
+                            if key in contents:
+                                merged[key] = contents[key]
+                            else:
+                                merged.pop(key, None)
+                    if self.sort_on_save:
+                        merged = dict(sorted(merged.items()))
+                    handler.save(merged, self.encoder)
+            except BaseException:
+                self._dirty |= dirty
+                self._cleared |= cleared
+                raise
+
+            with self._lock:
+                # keys changed while saving stay as they are
+                for key in [key for key in self if key not in merged and key not in self._dirty]:
+                    super().__delitem__(key)
+                super().update({key: value for key, value in merged.items() if key not in self._dirty})
+                self._changed()
+                self._synced_version = None if self._dirty else self._version
+                self._file_complete = True
         return self
 
     def _save_on_change(self) -> bool:
         if self.save_on_change:
-            self.save()
+            if self._batch_depth:
+                self._batch_pending = True
+                return False
+            if self._writer is not None:
+                self._writer.mark_dirty()
+            else:
+                self.save(changes_only=True)
             return True
         return False
 
+    def flush(self):
+        """writes any changes the background writer has not saved yet"""
+        if self._writer is not None:
+            self._writer.flush()
+        return self
+
+    @contextmanager
+    def batch(self):
+        """
+        holds back saves until the block exits, and saves once if anything changed.
+        If an exception is raised inside the block, the contents are rolled back instead.
+        """
+        # in concurrent mode the batch holds the locks until it exits, so the writes of other threads wait for it
+        # instead of being rolled back with it. Saving is locked first, like in `save`
+        with self._save_lock, self._lock:
+            backup = deepcopy(dict(self))
+            dirty, cleared = set(self._dirty), self._cleared
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                super().clear()
+                super().update(backup)
+                self._dirty |= dirty
+                self._cleared = cleared
+                self._changed()
+                if self._batch_depth == 1:
+                    self._batch_pending = False
+                raise
+            finally:
+                self._batch_depth -= 1
+        if not self._batch_depth and self._batch_pending:
+            self._batch_pending = False
+            self._save_on_change()
+
+    transaction = batch
+
     def update(self, *args, **kwargs):
-        super().update(*args, **kwargs)
+        new = dict(*args, **kwargs)
+        with self._lock:
+            super().update(new)
+            self._changed(new)
         self._save_on_change()
         return self
 
+    def __ior__(self, other):
+        return self.update(other)
+
     def pop(self, *args, **kwargs):
-        super().pop(*args, **kwargs)
+        with self._lock:
+            super().pop(*args, **kwargs)
+            self._changed(args[:1])
         self._save_on_change()
         return self
 
     def clear(self):
-        super().clear()
+        with self._lock:
+            super().clear()
+            self._dirty.clear()
+            self._cleared = True
+            self._changed()
         return self
 
-    def load(self):
-        """Loads the data from the file"""
+    def setdefault(self, key, default=None):
+        with self._lock:
+            if key not in self:
+                self[key] = default
+            return super().__getitem__(key)
+
+    def popitem(self):
+        with self._lock:
+            item = super().popitem()
+            self._changed(item[:1])
+        self._save_on_change()
+        return item
+
+    def load(self, force: bool = False):
+        """Loads the data from the file. Skipped when neither the dict nor the file changed, unless forced"""
         if os.path.exists(self.cfg_path):
             try:
-                self.update(self.save_handler.load(self.decoder))
+                with timer("CfgDict.load"):
+                    loaded = self._read_file(force)
+                    if loaded is not None:
+                        self._apply_loaded(loaded)
+                if loaded is not None:
+                    self._save_on_change()
+                    self._synced_version = self._version
             except Exception:
                 print(f"[!] failed to load config from {self.cfg_path}")
         else:
             self.save({})
         return self
 
+    def reload(self) -> dict:
+        """
+        Loads the file if it changed since it was last read or written, without saving.
+        Keys with unsaved changes keep their values, the others are replaced by the file's,
+        or removed if the file no longer has them.
+        Returns the keys whose values changed, as {key: (old value, new value)}, with None for missing values
+        """
+        if not os.path.exists(self.cfg_path) or self.save_handler.unchanged():
+            return {}
+        with timer("CfgDict.load"):
+            with self.save_handler.lock(exclusive=False) if self.locked else _NO_LOCK:
+                loaded = self.save_handler.load(self.decoder)
+        with self._lock:
+            changes = {
+                key: (self.get(key), value)
+                for key, value in loaded.items()
+                if key not in self._dirty and (key not in self or self[key] != value)
+            }
+            removed = [key for key in self if key not in loaded and key not in self._dirty]
+            changes.update((key, (self[key], None)) for key in removed)
+            if changes:
+                for key in removed:
+                    super().__delitem__(key)
+                super().update({key: changes[key][1] for key in loaded if key in changes})
+                self._changed(changes, dirty=False)
+            self._file_complete = self._covers(loaded)
+            if not self._dirty:
+                self._synced_version = self._version
+        return changes
+
+    def watch(self, callback: Callback | None = None, poll_interval: float = 1.0) -> ConfigWatcher:
+        """starts reloading the file whenever it changes, calling the callback with the changed keys"""
+        from .watcher import ConfigWatcher
+
+        watcher = ConfigWatcher(self, poll_interval)
+        if callback is not None:
+            watcher.on_change(callback)
+        return watcher.start()
+
+    def share(self, name: str | None = None, size: int | None = None) -> SharedConfig:
+        """publishes the contents to shared memory, for other processes to attach to with `SharedConfig.attach`"""
+        from .shared import SharedConfig
+
+        return SharedConfig.publish(self, name, size)
+
+    async def aload(self, force: bool = False):
+        """The same as `load`, but the file is read and parsed in a worker thread"""
+        import asyncio
+
+        if os.path.exists(self.cfg_path):
+            try:
+                loaded = await asyncio.to_thread(self._read_file, force)
+                if loaded is not None:
+                    self._apply_loaded(loaded)
+                    if self.save_on_change:
+                        await self.asave()
+                    self._synced_version = self._version
+            except Exception:
+                print(f"[!] failed to load config from {self.cfg_path}")
+        else:
+            await asyncio.to_thread(self.save, {})
+        return self
+
+    async def asave(self):
+        """
+        The same as `save`, but the dict is serialized and written in a worker thread.
+        Calls made while a save is running share a single save that starts once it is done.
+        """
+        import asyncio
+
+        current = self._asave_current
+        if current is not None and not current.done():
+            # the running save may have missed the latest changes, so everyone waiting shares the next one
+            if self._asave_next is None:
+                self._asave_next = asyncio.ensure_future(self._asave_after(current))
+            await asyncio.shield(self._asave_next)
+            return self
+        self._asave_current = asyncio.ensure_future(asyncio.to_thread(self.save))
+        await asyncio.shield(self._asave_current)
+        return self
+
+    async def _asave_after(self, previous: asyncio.Future) -> None:
+        import asyncio
+
+        try:
+            await previous
+        except Exception:
+            pass  # already raised to the callers of the previous save
+        self._asave_next = None
+        self._asave_current = asyncio.current_task()
+        await asyncio.to_thread(self.save)
+
+    def _read_file(self, force: bool = False) -> dict | None:
+        """reads the file, or returns None if neither the dict nor the file changed since they were synced"""
+        if not force and self._synced_version == self._version and self.save_handler.unchanged():
+            return None
+        with self.save_handler.lock(exclusive=False) if self.locked else _NO_LOCK:
+            return self.save_handler.load(self.decoder)
+
+    def _apply_loaded(self, loaded: dict) -> None:
+        with self._lock:
+            super().update(loaded)
+            self._changed(loaded, dirty=False)
+            # the loaded values replace any unsaved changes to the same keys
+            self._dirty.difference_update(loaded)
+            self._file_complete = self._covers(loaded)
+
+    def _replace_contents(self, contents: dict) -> None:
+        """replaces every key with the given contents, which are not known to match the file"""
+        with self._lock:
+            super().clear()
+            super().update(contents)
+            self._dirty.clear()
+            self._synced_version = None
+            self._file_complete = False
+            self._changed()
+
+    def _covers(self, loaded: dict) -> bool:
+        """whether every key is either in the loaded file or has unsaved changes"""
+        return all(key in loaded or key in self._dirty for key in self)
+
     def is_serializable(self, obj: Any) -> bool:
-        """checks if an object is JSON Serializable"""
-        return self.save_handler.try_serialize(obj)
+        """
+        checks if an object is serializable by the save handler.
+        The results are cached per type, except for containers
+        """
+        kind = type(obj)
+        if kind in self._serializable_types:
+            return self._serializable_types[kind]
+        serializable = self.save_handler.try_serialize(obj)
+        if not isinstance(obj, (dict, list, tuple, set, frozenset)):
+            self._serializable_types[kind] = serializable
+        return serializable
 
     def __setitem__(self, key, value):
         if isinstance(value, Enum):
@@ -97,11 +510,13 @@ class CfgDict(dict):
         else:
             new_val = value
 
-        super().__setitem__(key, new_val)
-        if self.save_on_change:
-            self.save()
+        with self._lock:
+            super().__setitem__(key, new_val)
+            self._changed((key,))
+        self._save_on_change()
 
     def __delitem__(self, key):
-        super().__delitem__(key)
-        if self.save_on_change:
-            self.save()
+        with self._lock:
+            super().__delitem__(key)
+            self._changed((key,))
+        self._save_on_change()
@@ -0,0 +1,271 @@
+"""
+Shell completion for the keys and values of `--set` and `--reset`, answered from a small index file
+that `ArgparseConfig` writes next to its config, so completing never builds the parser or reads the config.
+
+    python -m cfg_param_wrapper.completion bash config.json.complete >> ~/.bashrc
+    python -m cfg_param_wrapper.completion zsh config.json.complete > ~/.zfunc/_myprog
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import shlex
+from argparse import SUPPRESS, Action, ArgumentParser
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+from typing import Any
+
+# the header holds the format, the parser's signature, the config file's stat, the prog, and the option names.
+# every other line is `key<TAB>type<TAB>value<TAB>choice...`, which the shell scripts read with awk
+HEADER = "# cfg_param_wrapper completion index"
+FORMAT = "1"
+SUFFIX = ".complete"
+
+# (type name, original default, choices) of every dotted key
+Entries = dict
+
+
+def index_path(config_path: str | Path) -> Path:
+    config_path = Path(config_path)
+    return config_path.with_name(config_path.name + SUFFIX)
+
+
+def describe_parser(parser: ArgumentParser, exclude: Iterable[Action] = ()) -> tuple[str, Entries]:
+    """
+    returns a signature of the parser's arguments and subcommands, and the entries of every dotted key,
+    like the keys of `ParserTree`. Every subparser is visited, but no `ParserTree` is built
+    """
+    import hashlib
+
+    excluded = {id(action) for action in exclude}
+    entries: Entries = {}
+    parts: list[tuple] = []
+
+    def visit(parser: ArgumentParser, prefix: str) -> None:
+        for action in parser._actions:
+            if id(action) in excluded:
+                continue
+            # the choices of subcommands are their parsers, which are visited below
+            choices = None if action.choices is None else list(action.choices)
+            type_name = _type_name(action)
+            parts.append((prefix, action.option_strings, action.dest, action.nargs, type_name, action.default, choices))
+            if action.default != SUPPRESS:
+                entries[f"{prefix}{action.dest}"] = (type_name, action.default, choices)
+        if parser._subparsers is not None:
+            for name, subparser in parser._subparsers._group_actions[0].choices.items():
+                visit(subparser, f"{prefix}{name}.")
+
+    visit(parser, "")
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest(), entries
+
+
+def _type_name(action: Action) -> str:
+    if action.nargs == 0:
+        return "flag"
+    return getattr(action.type, "__name__", "str") if action.type is not None else "str"
+
+
+def _encode(value: Any) -> str:
+    """a value as it is typed after `--set KEY`, escaped so it holds no tab or newline"""
+    if isinstance(value, (list, tuple)):
+        return ",".join(map(_encode, value))
+    text = json.dumps(value, default=str)
+    return value if isinstance(value, str) and text == f'"{value}"' else text
+
+
+class CompletionIndex:
+    """The completion index of a config, and the shell scripts reading it."""
+
+    def __init__(self, path: str | Path):
+        self.path: Path = Path(path)
+
+    def header(self) -> dict[str, str] | None:
+        """the fields of the index's header, or None if there is no valid index"""
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                line = file.readline().rstrip("\n")
+        except OSError:
+            return None
+        fields = line.split("\t")
+        if len(fields) != 7 or fields[0] != HEADER or fields[1] != FORMAT:
+            return None
+        return dict(zip(("signature", "stat", "prog", "set", "reset"), fields[2:]))
+
+    def is_current(self, signature: str, stat: tuple[int, int, int] | None) -> bool:
+        header = self.header()
+        return header is not None and header["signature"] == signature and header["stat"] == _format_stat(stat)
+
+    def write(
+        self,
+        signature: str,
+        stat: tuple[int, int, int] | None,
+        entries: Entries,
+        values: Mapping[str, Any],
+        prog: str,
+        options: tuple[str, str] = ("--set", "--reset"),
+    ) -> None:
+        """writes the index, with the values of the config over the defaults. Failing to write is not an error"""
+        lines = ["\t".join((HEADER, FORMAT, signature, _format_stat(stat), prog, *options))]
+        for key, (type_name, default, choices) in entries.items():
+            value = values.get(key, default)
+            lines.append("\t".join([key, type_name, _encode(value), *map(_encode, choices or ())]))
+
+        import tempfile
+
+        try:
+            fd, tmp = tempfile.mkstemp(prefix=f".{self.path.name}.", suffix=".tmp", dir=self.path.parent)
+        except OSError:
+            return
+        try:
+            with open(fd, "w", encoding="utf-8") as file:
+                file.write("\n".join(lines) + "\n")
+            os.replace(tmp, self.path)
+        except OSError:
+            os.unlink(tmp)
+
+    def _lines(self) -> list[str]:
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                return file.read().splitlines()[1:]
+        except OSError:
+            return []
+
+    def entries(self) -> dict[str, list[str]]:
+        """{key: [type, value, choices...]} of every key in the index"""
+        return {fields[0]: fields[1:] for fields in (line.split("\t") for line in self._lines())}
+
+    def complete(self, words: list[str]) -> list[str]:
+        """
+        the completions of the last word, given the words after the program's name.
+        Does what the shell scripts do, for other shells and for testing them
+        """
+        header = self.header()
+        if header is None or not words:
+            return []
+        *before, current = words
+        option, distance = None, 0
+        for word in reversed(before):
+            distance += 1
+            if word.startswith("-"):
+                option = word
+                break
+        if (option == header["set"] and distance == 1) or option == header["reset"]:
+            candidates = [line[: line.find("\t")] for line in self._lines() if line.startswith(current)]
+        elif option == header["set"] and distance == 2:
+            start = f"{before[-1]}\t"
+            fields = next((line.split("\t") for line in self._lines() if line.startswith(start)), [])
+            candidates = fields[3:] or fields[2:3]
+        else:
+            return []
+        return [candidate for candidate in candidates if candidate.startswith(current)]
+
+    def bash_script(self, prog: str | None = None) -> str:
+        header = self.header() or {}
+        prog = prog or header.get("prog", "")
+        return _BASH.format(**self._script_fields(prog, header))
+
+    def zsh_script(self, prog: str | None = None) -> str:
+        header = self.header() or {}
+        prog = prog or header.get("prog", "")
+        return _ZSH.format(**self._script_fields(prog, header))
+
+    def _script_fields(self, prog: str, header: Mapping[str, str]) -> dict[str, str]:
+        if not prog:
+            raise ValueError(f"{self.path} holds no program name, so one has to be given")
+        return {
+            "name": re.sub(r"\W", "_", prog),
+            "prog": shlex.quote(prog),
+            "index": shlex.quote(str(self.path.resolve())),
+            "set": shlex.quote(header.get("set", "--set")),
+            "reset": shlex.quote(header.get("reset", "--reset")),
+        }
+
+
+def _format_stat(stat: tuple[int, int, int] | None) -> str:
+    return ":".join(map(str, stat)) if stat is not None else "none"
+
+
+_KEYS = r"""awk -F'\t' '!/^#/ {{print $1}}'"""
+_VALUES = r"""awk -F'\t' -v key="$key" '$1 == key {{if (NF > 3) for (i = 4; i <= NF; i++) print $i; else print $3}}'"""
+
+_BASH = (
+    r"""_cfg_param_wrapper_{name}() {{
+    local index={index} cur=${{COMP_WORDS[COMP_CWORD]}} option= distance=0 i key
+    for ((i = COMP_CWORD - 1; i > 0; i--)); do
+        distance=$((distance + 1))
+        if [[ ${{COMP_WORDS[i]}} == -* ]]; then
+            option=${{COMP_WORDS[i]}}
+            break
+        fi
+    done
+    local IFS=$'\n'
+    if [[ ($option == {set} && $distance == 1) || $option == {reset} ]]; then
+        COMPREPLY=($(compgen -W "$("""
+    + _KEYS
+    + r""" "$index")" -- "$cur"))
+    elif [[ $option == {set} && $distance == 2 ]]; then
+        key=${{COMP_WORDS[COMP_CWORD-1]}}
+        COMPREPLY=($(compgen -W "$("""
+    + _VALUES
+    + r""" "$index")" -- "$cur"))
+    fi
+}}
+complete -o default -F _cfg_param_wrapper_{name} {prog}
+"""
+)
+
+_ZSH = (
+    r"""#compdef {prog}
+_cfg_param_wrapper_{name}() {{
+    local index={index} option= distance=0 i key
+    local -a candidates
+    for ((i = CURRENT - 1; i > 1; i--)); do
+        (( distance++ ))
+        if [[ $words[i] == -* ]]; then
+            option=$words[i]
+            break
+        fi
+    done
+    if [[ ($option == {set} && $distance == 1) || $option == {reset} ]]; then
+        candidates=(${{(f)"$("""
+    + _KEYS
+    + r""" $index)"}})
+    elif [[ $option == {set} && $distance == 2 ]]; then
+        key=$words[CURRENT-1]
+        candidates=(${{(f)"$("""
+    + _VALUES
+    + r""" $index)"}})
+    else
+        _default
+        return
+    fi
+    compadd -- $candidates
+}}
+compdef _cfg_param_wrapper_{name} {prog}
+"""
+)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = ArgumentParser(prog="python -m cfg_param_wrapper.completion", description=__doc__.split("\n\n")[0])
+    parser.add_argument("shell", choices=["bash", "zsh", "complete"], help="the script to print, or `complete`")
+    parser.add_argument("index", type=Path, help=f"the index, next to the config file (`<config>{SUFFIX}`)")
+    parser.add_argument("words", nargs="*", help="for `complete`, the words after the program's name")
+    parser.add_argument("--prog", help="the program to complete, by default the one that wrote the index")
+    args = parser.parse_args(argv)
+
+    index = CompletionIndex(args.index)
+    if index.header() is None:
+        parser.error(f"{args.index} is not a completion index")
+    if args.shell == "complete":
+        print("\n".join(index.complete(args.words)))
+    elif args.shell == "bash":
+        print(index.bash_script(args.prog), end="")
+    else:
+        print(index.zsh_script(args.prog), end="")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
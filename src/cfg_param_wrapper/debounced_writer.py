@@ -0,0 +1,95 @@
+"""A background writer used to save a CfgDict without blocking on disk I/O."""
+from __future__ import annotations
+
+import atexit
+import threading
+import time
+import weakref
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .cfg_dict import CfgDict
+
+
+class DebouncedWriter:
+    """
+    Saves a CfgDict from a background thread once it stopped changing for `delay` seconds,
+    or at most `max_delay` seconds after the first unsaved change.
+    """
+
+    def __init__(self, cfg_dict: CfgDict, delay: float = 0.5, max_delay: float = 5.0):
+        self.delay: float = delay
+        self.max_delay: float = max_delay
+        self._cfg_dict = weakref.ref(cfg_dict, lambda _: self.close())
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        # a strong reference to the dict while it has unsaved changes, so they are never lost
+        self._pending: CfgDict | None = None
+        self._first_change: float = 0.0
+        self._last_change: float = 0.0
+        self._closed: bool = False
+        self._thread: threading.Thread | None = None
+        _WRITERS.add(self)
+
+    @property
+    def dirty(self) -> bool:
+        return self._pending is not None
+
+    def mark_dirty(self) -> None:
+        """schedules a save of the latest contents"""
+        with self._condition:
+            now = time.monotonic()
+            if self._pending is None:
+                self._pending = self._cfg_dict()
+                self._first_change = now
+            self._last_change = now
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="CfgDict-writer", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def flush(self) -> None:
+        """saves any pending changes immediately, in the calling thread"""
+        with self._write_lock:
+            with self._condition:
+                cfg_dict, self._pending = self._pending, None
+            if cfg_dict is None:
+                return
+            try:
+                cfg_dict.save(changes_only=True)
+            except RuntimeError:
+                # the contents changed while they were being written, write them again
+                self.mark_dirty()
+
+    def close(self) -> None:
+        """stops the background thread after writing any pending changes"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                while self._pending is not None:
+                    now = time.monotonic()
+                    deadline = min(self._last_change + self.delay, self._first_change + self.max_delay)
+                    if now >= deadline:
+                        break
+                    self._condition.wait(deadline - now)
+                if self._pending is None and self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[!] failed to save config in the background: {e}")
+
+
+_WRITERS: weakref.WeakSet[DebouncedWriter] = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_all() -> None:
+    for writer in list(_WRITERS):
+        writer.flush()
@@ -0,0 +1,144 @@
+"""Immutable records of config values, for code that reads them often and never changes them."""
+from __future__ import annotations
+
+import keyword
+from argparse import Namespace
+from collections.abc import Iterator, Mapping
+from operator import attrgetter
+from typing import Any
+
+# the record type of every shape of config, by its keys
+_TYPES: dict[tuple[str, ...], type[FrozenConfig]] = {}
+
+
+class FrozenConfig:
+    """
+    A read-only record of config values, read as attributes (`frozen.scale`) or by key (`frozen["scale"]`).
+    A `__slots__` class is made once for every set of keys, so records hold no dict of their own.
+    Nested dicts become nested records and lists become tuples, so records are hashable.
+    Keys that are not identifiers, or start with an underscore, can only be read by key.
+    """
+
+    __slots__ = ("_FrozenConfig__hash",)
+    # the keys, the names of the slots holding their values, and the getter and setters of the slots
+    _fields: tuple[str, ...] = ()
+    _slots: tuple[str, ...] = ()
+    _index: dict[str, str] = {}
+    _getter: Any = staticmethod(lambda self: ())
+    _setters: tuple = ()
+
+    @classmethod
+    def _make(cls, values: Iterator[Any] | tuple) -> FrozenConfig:
+        self = object.__new__(cls)
+        for setter, value in zip(cls._setters, values):
+            setter(self, value)
+        return self
+
+    def _values(self) -> tuple:
+        return self._getter(self)
+
+    def _asdict(self) -> dict:
+        """the values as nested dicts and lists"""
+        return {key: _thaw(value) for key, value in zip(self._fields, self._values())}
+
+    def _replace(self, **changes) -> FrozenConfig:
+        """a new record with some of the values changed"""
+        return freeze({**dict(zip(self._fields, self._values())), **changes})
+
+    def __getitem__(self, key: str) -> Any:
+        return getattr(self, self._index[key])
+
+    def __contains__(self, key) -> bool:
+        return key in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._fields)
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, FrozenConfig):
+            return NotImplemented
+        return self._fields == other._fields and self._values() == other._values()
+
+    def __hash__(self) -> int:
+        try:
+            return self.__hash
+        except AttributeError:
+            _hash_slot.__set__(self, hash((self._fields, self._values())))
+            return self.__hash
+
+    def __reduce__(self):
+        # only the keys and values are pickled, and workers make or reuse the record type for the keys
+        return (_rebuild, (self._fields, self._values()))
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{key}={value!r}" for key, value in zip(self._fields, self._values()))
+        return f"{type(self).__name__}({values})"
+
+
+_hash_slot = FrozenConfig.__dict__["_FrozenConfig__hash"]
+
+
+def _slot_name(key: Any, index: int) -> str:
+    if isinstance(key, str) and key.isidentifier() and not keyword.iskeyword(key) and not key.startswith("_"):
+        return key
+    return f"_{index}"
+
+
+def frozen_type(keys: tuple[str, ...]) -> type[FrozenConfig]:
+    """returns the record type of a set of keys, made on first use"""
+    if keys not in _TYPES:
+        slots = tuple(_slot_name(key, index) for index, key in enumerate(keys))
+        namespace = {"__slots__": slots, "_fields": keys, "_slots": slots, "_index": dict(zip(keys, slots))}
+        cls = type("FrozenConfig", (FrozenConfig,), namespace)
+        cls._setters = tuple(cls.__dict__[slot].__set__ for slot in slots)
+        if len(slots) > 1:
+            cls._getter = attrgetter(*slots)
+        elif slots:
+            cls._getter = staticmethod(lambda self, get=attrgetter(*slots): (get(self),))
+        _TYPES[keys] = cls
+    return _TYPES[keys]
+
+
+def freeze(config: Mapping | Namespace) -> FrozenConfig:
+    """makes a read-only record of a mapping, like a CfgDict, or of a Namespace"""
+    if isinstance(config, Namespace):
+        config = vars(config)
+    keys = tuple(config)
+    return frozen_type(keys)._make(_freeze_value(value) for value in config.values())
+
+
+def _freeze_value(value: Any) -> Any:
+    if isinstance(value, (str, int, float)):
+        return value
+    if isinstance(value, FrozenConfig):
+        return value
+    if isinstance(value, (Mapping, Namespace)):
+        return freeze(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(map(_freeze_value, value))
+    if isinstance(value, (set, frozenset)):
+        return frozenset(map(_freeze_value, value))
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, FrozenConfig):
+        return value._asdict()
+    if isinstance(value, tuple):
+        return list(map(_thaw, value))
+    if isinstance(value, frozenset):
+        return set(map(_thaw, value))
+    return value
+
+
+def _rebuild(keys: tuple[str, ...], values: tuple) -> FrozenConfig:
+    return frozen_type(keys)._make(values)
@@ -6,6 +6,9 @@ from typing import Callable
 
 from .cfg_dict import CfgDict
 
+# the parameter defaults recorded by deferred wrap_config calls, by the id of their CfgDict
+_PENDING: dict[int, tuple[CfgDict, list[dict[str, inspect.Parameter]]]] = {}
+
 
 def copy_func(f, name=None):
     """
@@ -20,13 +23,90 @@ def copy_func(f, name=None):
     return fn
 
 
-def wrap_config(cfg_dict: CfgDict) -> Callable[..., Callable]:
+class _CallPlan:
+    """The resolved keyword arguments of a wrapped function, recompiled only when its CfgDict changes."""
+
+    __slots__ = ("cfg_dict", "names", "defaults", "cached", "deferred")
+
+    def __init__(self, cfg_dict: CfgDict, parameters: dict[str, inspect.Parameter], deferred: bool = False):
+        self.cfg_dict = cfg_dict
+        self.names: tuple[str, ...] = tuple(parameters)
+        self.defaults: dict = {name: param.default for name, param in parameters.items()}
+        # (version, resolved), published as one tuple so threads never pair a version with another's kwargs
+        self.cached: tuple[int, dict] = (-1, {})
+        self.deferred: bool = deferred
+
+    def resolve(self) -> dict:
+        """returns the function defaults updated with the config"""
+        cfg = self.cfg_dict.snapshot()
+        resolved = self.defaults.copy()
+        for name in self.names:
+            if name in cfg:
+                resolved[name] = cfg[name]
+        return resolved
+
+    def current(self) -> dict:
+        """returns the function defaults updated with the config, recompiling them if the config changed"""
+        cached = self.cached
+        version = self.cfg_dict.version
+        if version != cached[0]:
+            if self.deferred:
+                # the first call registers the parameters of every deferred function
+                self.deferred = False
+                finalize_config(self.cfg_dict)
+                version = self.cfg_dict.version
+            # read after the version, so the snapshot is at least as new as the version it is cached under
+            cached = self.cached = (version, self.resolve())
+        return cached[1]
+
+    def bind(self, args: tuple, kwargs: dict) -> dict:
+        """maps args and kwargs on top of the current defaults"""
+        if len(args) > len(self.names):
+            raise TypeError(f"takes {len(self.names)} positional arguments but {len(args)} were given")
+        new_kwargs = self.current().copy()
+        new_kwargs.update(kwargs)
+        # convert args to kwargs
+        new_kwargs.update(zip(self.names, args))
+        return new_kwargs
+
+
+def _register_parameters(cfg_dict: CfgDict, *parameter_sets: dict[str, inspect.Parameter]) -> None:
+    """adds the serializable defaults of parameters missing from the config, and saves once if any were added"""
+    new = {}
+    for parameters in parameter_sets:
+        for name, param in parameters.items():
+            if name not in cfg_dict and name not in new and cfg_dict.is_serializable(param.default):
+                new[name] = param.default
+    if new:
+        with cfg_dict.batch():
+            for name, default in new.items():
+                cfg_dict[name] = default
+        if not cfg_dict.save_on_change:
+            cfg_dict.save()
+
+
+def finalize_config(cfg_dict: CfgDict | None = None) -> None:
+    """registers the parameters recorded by deferred wrap_config calls, for one CfgDict or all of them"""
+    if cfg_dict is None:
+        pending = list(_PENDING.values())
+        _PENDING.clear()
+    else:
+        pending = [_PENDING.pop(id(cfg_dict))] if id(cfg_dict) in _PENDING else []
+    for pending_cfg, parameter_sets in pending:
+        _register_parameters(pending_cfg, *parameter_sets)
+
+
+def wrap_config(cfg_dict: CfgDict, defer: bool = False) -> Callable[..., Callable]:
     '''Wraps a function with a CfgDict to make an easy config setup.
 
     Parameters
     ----------
     cfg_dict : CfgDict
         The file to write to. Must be a CfgDict.
+    defer : bool, optional
+        only records the parameters, and registers them in the config with every other deferred function
+        when `finalize_config` is called or a wrapped function is first called, by default False.
+        Useful for apps that wrap many functions at import time.
 
     Returns
     -------
@@ -37,33 +117,32 @@ def wrap_config(cfg_dict: CfgDict) -> Callable[..., Callable]:
 
         # get parameters and defaults
         parameters: dict[str, inspect.Parameter] = dict(inspect.signature(func).parameters)
-        save_after = False
-        for name, param in parameters.items():
-            if name not in cfg_dict:
-                if cfg_dict.is_serializable(param.default):
-                    save_after = True
-                    cfg_dict[name] = param.default
-        if save_after:
-            cfg_dict.save()
-        new_defaults = dict(zip(parameters.keys(), map(lambda x: x.default, parameters.values())))
-        new_defaults.update({k: v for k, v in cfg_dict.items() if k in new_defaults})
+        if defer:
+            _PENDING.setdefault(id(cfg_dict), (cfg_dict, []))[1].append(parameters)
+        else:
+            _register_parameters(cfg_dict, parameters)
+        plan = _CallPlan(cfg_dict, parameters, deferred=defer)
 
         func = copy_func(func)
 
-        @functools.wraps(func)
-        def _wrap(*args, **kwargs):
-            new_defaults = dict(zip(parameters.keys(), map(lambda x: x.default, parameters.values())))
-            new_defaults.update({k: v for k, v in cfg_dict.items() if k in new_defaults})
-            new_defaults.update(kwargs)
+        if inspect.iscoroutinefunction(func):
+            # an async wrapper, so the wrapped function is still recognized as a coroutine function
+
+            @functools.wraps(func)
+            async def _wrap(*args, **kwargs):
+                if not args and not kwargs:
+                    return await func(**plan.current())  # type: ignore
+                return await func(**plan.bind(args, kwargs))  # type: ignore
+
+        else:
 
-            # convert args to kwargs
-            default_lst = list(enumerate(new_defaults.items()))
-            for idx, arg in enumerate(args):
-                default_lst[idx] = (default_lst[idx][0], (default_lst[idx][1][0], arg))
-            new_defaults = dict(map(lambda arg: arg[1], default_lst))
-            return func(**new_defaults)  # type: ignore
+            @functools.wraps(func)
+            def _wrap(*args, **kwargs):
+                if not args and not kwargs:
+                    return func(**plan.current())  # type: ignore
+                return func(**plan.bind(args, kwargs))  # type: ignore
 
-        _wrap.__wrapped__.__defaults__ = tuple(new_defaults.values())  # type: ignore
+        _wrap.__wrapped__.__defaults__ = tuple(plan.resolve().values())  # type: ignore
 
         return _wrap
 
@@ -0,0 +1,173 @@
+"""
+Optional timing counters for loading, saving and parsing.
+
+Nothing is recorded until `enable()` is called or a hook is added, and a disabled timer costs a single attribute check.
+Setting the `CFG_PARAM_WRAPPER_STATS` environment variable enables recording and prints a summary at exit,
+to stderr when it is `1`, or appended to the file it names otherwise.
+"""
+from __future__ import annotations
+
+import atexit
+import os
+import sys
+from collections import deque
+from collections.abc import Callable
+from time import perf_counter
+
+ENV_VAR = "CFG_PARAM_WRAPPER_STATS"
+
+# the most recent durations kept per name to compute percentiles
+MAX_SAMPLES = 4096
+
+Hook = Callable[[str, float, int], None]
+
+
+class Stat:
+    """counts, durations and bytes recorded under a single name"""
+
+    __slots__ = ("count", "total", "max", "nbytes", "samples")
+
+    def __init__(self):
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+        self.nbytes: int = 0
+        self.samples: deque[float] = deque(maxlen=MAX_SAMPLES)
+
+    def add(self, seconds: float, nbytes: int = 0) -> None:
+        self.count += 1
+        self.total += seconds
+        self.nbytes += nbytes
+        if seconds > self.max:
+            self.max = seconds
+        self.samples.append(seconds)
+
+    def percentile(self, percent: float) -> float:
+        """the given percentile of the most recent durations, in seconds"""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+class Stats:
+    """
+    Collects a `Stat` per name, and passes every recording to the registered hooks as `hook(name, seconds, nbytes)`.
+    """
+
+    def __init__(self):
+        self.stats: dict[str, Stat] = {}
+        self.hooks: list[Hook] = []
+        self.collecting: bool = False
+        # whether timers record anything, checked before any work is done
+        self.active: bool = False
+
+    def _update(self) -> None:
+        self.active = self.collecting or bool(self.hooks)
+
+    def enable(self) -> None:
+        self.collecting = True
+        self._update()
+
+    def disable(self) -> None:
+        self.collecting = False
+        self._update()
+
+    def add_hook(self, hook: Hook) -> None:
+        self.hooks.append(hook)
+        self._update()
+
+    def remove_hook(self, hook: Hook) -> None:
+        self.hooks.remove(hook)
+        self._update()
+
+    def reset(self) -> None:
+        self.stats.clear()
+
+    def record(self, name: str, seconds: float, nbytes: int = 0) -> None:
+        if self.collecting:
+            stat = self.stats.get(name)
+            if stat is None:
+                stat = self.stats[name] = Stat()
+            stat.add(seconds, nbytes)
+        for hook in self.hooks:
+            hook(name, seconds, nbytes)
+
+    def timer(self, name: str) -> _Timer | _NullTimer:
+        """
+        times a block under `name`. The number of bytes read or written can be set on the returned timer.
+        """
+        if self.active:
+            return _Timer(self, name)
+        return _NULL_TIMER
+
+    def summary(self) -> str:
+        lines = [
+            f"{'name':<40} {'count':>7} {'total ms':>10} {'mean us':>10}"
+            f" {'p50 us':>10} {'p95 us':>10} {'max us':>10} {'bytes':>12}"
+        ]
+        for name, stat in sorted(self.stats.items()):
+            lines.append(
+                f"{name:<40} {stat.count:>7} {stat.total * 1e3:>10.3f} {stat.total / stat.count * 1e6:>10.1f}"
+                f" {stat.percentile(50) * 1e6:>10.1f} {stat.percentile(95) * 1e6:>10.1f} {stat.max * 1e6:>10.1f}"
+                f" {stat.nbytes:>12}"
+            )
+        return "\n".join(lines)
+
+
+class _Timer:
+    __slots__ = ("stats", "name", "nbytes", "start")
+
+    def __init__(self, stats: Stats, name: str):
+        self.stats = stats
+        self.name = name
+        self.nbytes: int = 0
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        self.stats.record(self.name, perf_counter() - self.start, self.nbytes)
+
+
+class _NullTimer:
+    __slots__ = ("nbytes",)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+STATS = Stats()
+"""the counters recorded by this package"""
+
+timer = STATS.timer
+enable = STATS.enable
+disable = STATS.disable
+add_hook = STATS.add_hook
+remove_hook = STATS.remove_hook
+reset = STATS.reset
+summary = STATS.summary
+
+
+def _dump_summary(target: str) -> None:
+    if not STATS.stats:
+        return
+    if target == "1":
+        print(STATS.summary(), file=sys.stderr)
+        return
+    try:
+        with open(target, "a", encoding="utf-8") as file:
+            file.write(STATS.summary() + "\n")
+    except OSError:
+        print(f"[!] failed to write stats to {target}", file=sys.stderr)
+
+
+if os.environ.get(ENV_VAR):
+    enable()
+    atexit.register(_dump_summary, os.environ[ENV_VAR])
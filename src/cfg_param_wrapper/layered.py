@@ -0,0 +1,225 @@
+"""A read-only view merging several config layers, like system, user and project files and environment variables."""
+from __future__ import annotations
+
+import os
+from collections.abc import Iterable, Iterator, Mapping
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .cfg_dict import CfgDict
+
+_MISSING = object()
+
+
+def _flatten_into(out: dict, dct: Mapping, prefix: str = "") -> dict:
+    """flattens nested dicts into dotted keys, like `ParserTree.flatten`"""
+    for key, value in dct.items():
+        if isinstance(value, dict):
+            _flatten_into(out, value, f"{prefix}{key}.")
+        else:
+            out[f"{prefix}{key}"] = value
+    return out
+
+
+def _same(a, b) -> bool:
+    # 1, 1.0 and True are equal, but are different config values
+    return a is b or (type(a) is type(b) and a == b)
+
+
+class LayeredConfig(Mapping):
+    """
+    A flattened view of several layers, where each layer overrides the ones before it,
+    and environment variables like `PREFIX_SECTION__KEY` (for `section.key`) override every layer.
+    Layers are CfgDicts or other mappings. The view only re-reads the top-level keys that changed in the CfgDicts
+    whose version changed, and only resolves again the dotted keys whose values changed.
+    Environment variables are kept as strings, which `ArgparseConfig` converts with the type of their action.
+    """
+
+    ENV = "env"
+
+    def __init__(
+        self,
+        layers: Mapping[str, Mapping] | Iterable[tuple[str, Mapping]] = (),
+        env_prefix: str | None = None,
+        environ: Mapping[str, str] | None = None,
+    ):
+        self.layers: dict[str, Mapping] = dict(layers)
+        self.env_prefix: str | None = env_prefix
+        self.environ: Mapping[str, str] = os.environ if environ is None else environ
+        if env_prefix is not None:
+            self.layers[self.ENV] = self._read_environment()
+        # the flattened contents of each layer, also split by top-level key,
+        # and the versions of the CfgDicts they were read at, or _MISSING for layers that have to be read again
+        self._flat_layers: dict[str, dict] = {}
+        self._sections: dict[str, dict[Any, dict]] = {}
+        self._versions: dict[str, Any] = {}
+        self._flat: dict[str, Any] = {}
+        self._sources: dict[str, str] = {}
+        self.refresh()
+
+    @classmethod
+    def from_files(
+        cls,
+        paths: Mapping[str, str | Path],
+        env_prefix: str | None = None,
+        environ: Mapping[str, str] | None = None,
+        **kwargs,
+    ) -> LayeredConfig:
+        """
+        makes a layer for each file, from the lowest to the highest precedence.
+        Missing files are empty layers, and are not created.
+        """
+        from .cfg_dict import CfgDict
+
+        layers = {}
+        for name, path in paths.items():
+            layers[name] = CfgDict(path, start_empty=True, **kwargs)
+            if os.path.exists(path):
+                layers[name].load()
+        return cls(layers, env_prefix, environ)
+
+    @property
+    def flat(self) -> dict[str, Any]:
+        """the merged values of every dotted key"""
+        self.refresh()
+        return self._flat
+
+    def source_of(self, key: str) -> str | None:
+        """the name of the layer the value of a dotted key comes from"""
+        self.refresh()
+        return self._sources.get(key)
+
+    def keys_from(self, name: str) -> list[str]:
+        """the dotted keys whose values come from a layer"""
+        self.refresh()
+        return [key for key, source in self._sources.items() if source == name]
+
+    def as_dict(self) -> dict:
+        """the merged values as nested dicts"""
+        out: dict = {}
+        for key, value in self.flat.items():
+            *sections, name = key.split(".")
+            target = out
+            for section in sections:
+                if not isinstance(target.get(section), dict):
+                    target[section] = {}
+                target = target[section]
+            target[name] = value
+        return out
+
+    def add_layer(self, name: str, layer: Mapping, index: int | None = None) -> None:
+        """adds a layer overriding the others, or at a position. The environment always stays on top"""
+        names = [n for n in self.layers if n != name]
+        top = len(names) - (self.ENV in self.layers)
+        names.insert(top if index is None else min(index, top), name)
+        layers = {**self.layers, name: layer}
+        self.layers = {n: layers[n] for n in names}
+        self._versions[name] = _MISSING  # type: ignore
+        self.refresh()
+
+    def remove_layer(self, name: str) -> Mapping:
+        layer = self.layers.pop(name)
+        self._versions.pop(name, None)
+        self._sections.pop(name, None)
+        old = self._flat_layers.pop(name, {})
+        for key in old:
+            self._resolve(key)
+        return layer
+
+    def load(self) -> LayeredConfig:
+        """loads the CfgDict layers whose files exist"""
+        from .cfg_dict import CfgDict
+
+        for layer in self.layers.values():
+            if isinstance(layer, CfgDict) and os.path.exists(layer.cfg_path):
+                layer.load()
+        return self
+
+    def reload_environment(self) -> set[str]:
+        """reads the environment variables again, and returns the keys whose values changed"""
+        if self.env_prefix is None:
+            return set()
+        self.layers[self.ENV] = self._read_environment()
+        self._versions[self.ENV] = _MISSING  # type: ignore
+        return self.refresh()
+
+    def refresh(self) -> set[str]:
+        """reads the layers that changed, and returns the keys whose merged values changed"""
+        changed: set[str] = set()
+        for name, layer in self.layers.items():
+            version = getattr(layer, "version", None)
+            if name in self._flat_layers and self._versions[name] == version:
+                continue  # other mappings are only read when added
+            keys = None
+            if name in self._flat_layers and self._versions[name] is not _MISSING and hasattr(layer, "changed_since"):
+                keys = layer.changed_since(self._versions[name])  # type: ignore
+            contents: CfgDict | Mapping = layer.snapshot() if hasattr(layer, "snapshot") else layer  # type: ignore
+            if keys is None:
+                old = self._flat_layers.get(name, {})
+                sections = self._sections[name] = {key: _flatten_into({}, {key: contents[key]}) for key in contents}
+                new = self._flat_layers[name] = {}
+                for section in sections.values():
+                    new.update(section)
+                changed.update(key for key, value in new.items() if not _same(old.get(key, _MISSING), value))
+                changed.update(key for key in old if key not in new)
+            else:
+                # only the sections of the top-level keys that changed are flattened again
+                flat, sections = self._flat_layers[name], self._sections[name]
+                for key in keys:
+                    old = sections.pop(key, {})
+                    new = _flatten_into({}, {key: contents[key]}) if key in contents else {}
+                    if new:
+                        sections[key] = new
+                    for flat_key in old.keys() - new.keys():
+                        del flat[flat_key]
+                        changed.add(flat_key)
+                    changed.update(
+                        flat_key for flat_key, value in new.items() if not _same(old.get(flat_key, _MISSING), value)
+                    )
+                    flat.update(new)
+            self._versions[name] = version
+        for key in changed:
+            self._resolve(key)
+        return changed
+
+    def _resolve(self, key: str) -> None:
+        for name in reversed(self.layers):
+            flat = self._flat_layers.get(name, {})
+            if key in flat:
+                self._flat[key] = flat[key]
+                self._sources[key] = name
+                return
+        self._flat.pop(key, None)
+        self._sources.pop(key, None)
+
+    def _read_environment(self) -> dict:
+        """reads `PREFIX_SECTION__KEY` variables into nested dicts of strings"""
+        prefix = f"{self.env_prefix}_"
+        out: dict = {}
+        for variable, text in self.environ.items():
+            if not variable.startswith(prefix) or len(variable) == len(prefix):
+                continue
+            *sections, name = variable[len(prefix) :].lower().split("__")
+            target = out
+            for section in sections:
+                if not isinstance(target.get(section), dict):
+                    target[section] = {}
+                target = target[section]
+            target[name] = text
+        return out
+
+    def __getitem__(self, key: str) -> Any:
+        return self.flat[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.flat)
+
+    def __len__(self) -> int:
+        return len(self.flat)
+
+    def __contains__(self, key) -> bool:
+        return key in self.flat
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self.layers)})"
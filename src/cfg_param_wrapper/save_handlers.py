@@ -1,17 +1,45 @@
 from __future__ import annotations
 
-import json
+import marshal
+import os
+import threading
 from abc import abstractmethod
-from collections.abc import Callable, Mapping
+from collections.abc import Callable, Collection, Iterator, Mapping
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-import toml
+from .instrumentation import timer
+
+# the format modules are imported by the handlers that use them, so unused formats cost no import time
+if TYPE_CHECKING:
+    import sqlite3
+
+    import toml
+
+_MISSING = object()
 
 
 class SaveHandler:
+    # whether `save_changes` only writes the given keys over the file's current contents,
+    # so it can be used after something else changed the file
+    merges_changes: bool = False
+
     def __init__(self, path: str | Path):
-        self.path: Path = Path(path)
+        self._path: Path = Path(path)
+        # (mtime_ns, size, inode) of the file when it was last read or written by this handler
+        self._stat: tuple[int, int, int] | None = None
+        # writes to a temporary file and renames it over the path, so readers never see a partial file
+        self.atomic: bool = False
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @path.setter
+    def path(self, path: str | Path) -> None:
+        self._path = Path(path)
+        self._stat = None
 
     @abstractmethod
     def save(self, dct: dict, encoder=None) -> None:
@@ -25,25 +53,159 @@ class SaveHandler:
     def try_serialize(self, object: object) -> bool:
         """Tries to serialize the item and returns whether it is successful"""
 
-    def _write(self, func: Callable, mode="w") -> None:
-        with open(self.path, mode, encoding="utf-8") as file:
-            func(file)
+    def save_changes(self, dct: dict, keys: Collection, encoder=None) -> None:
+        """
+        saves the given dict to self.path, of which only `keys` changed since it was last saved or loaded.
+        Keys missing from the dict were deleted. Handlers that can't update part of the file save all of it.
+        """
+        self.save(dct, encoder)
+
+    def file_stat(self) -> tuple[int, int, int] | None:
+        """returns the (mtime_ns, size, inode) of the file, or None if it does not exist"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def unchanged(self) -> bool:
+        """checks whether the file is the same as when it was last read or written by this handler"""
+        return self._stat is not None and self._stat == self.file_stat()
+
+    def watched_paths(self) -> list[Path] | None:
+        """
+        the files whose writes change what is loaded, which are closed after every write.
+        None if changes can't be noticed that way, so watchers have to poll `file_stat`
+        """
+        return [self.path]
+
+    @contextmanager
+    def lock(self, exclusive: bool = True) -> Iterator[None]:
+        """holds an advisory lock between processes, on a `.lock` file next to self.path"""
+        import fcntl
+
+        with open(self.path.with_name(self.path.name + ".lock"), "a") as file:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+    def _write(self, dumps: Callable[[], str]) -> None:
+        with timer(f"{type(self).__name__}.serialize") as timed:
+            # serialized before the file is opened, so a value that can't be serialized leaves the file as it was
+            text = dumps()
+            self._stat = None
+            self._write_file(self.path, text)
+            self._stat = self.file_stat()
+            timed.nbytes = self._stat[1] if self._stat is not None else 0
+
+    def _write_file(self, path: Path, text: str) -> None:
+        if not self.atomic:
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(text)
+            return
+
+        import tempfile
+
+        fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+        try:
+            with open(fd, "w", encoding="utf-8") as file:
+                file.write(text)
+                file.flush()
+                os.fsync(file.fileno())
+            os.chmod(tmp, path.stat().st_mode & 0o777 if path.exists() else 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
 
     def _read(self, func: Callable, mode="r") -> Any:
-        with open(self.path, mode, encoding="utf-8") as file:
-            return func(file)
+        # stat before reading, so a change made during the read is noticed by the next load
+        stat = self.file_stat()
+        with timer(f"{type(self).__name__}.deserialize") as timed:
+            with open(self.path, mode, encoding="utf-8") as file:
+                out = func(file)
+            timed.nbytes = stat[1] if stat is not None else 0
+        self._stat = stat
+        return out
+
+
+def _optional_module(name: str) -> Any:
+    """imports an optional codec, or returns None if it is not installed"""
+    import importlib
+
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
 
 
 class JsonSaveHandler(SaveHandler):
-    """A save handler made to save and load .json files"""
+    """
+    A save handler made to save and load .json files.
+    The `codec` can be "json" for the standard library, "orjson", or "auto" to use `orjson` when it is installed.
+    `orjson` reads integers over 64 bits as floats and writes NaN and infinity as null, so it has to be chosen.
+    "auto" only writes with `orjson` when `compact` is set, so indented files keep their 4 spaces.
+    The standard library is used for values `orjson` can't write, like integers over 64 bits,
+    and whenever an encoder or decoder is given.
+    """
+
+    suffix = ".json"
+    CODECS = ("auto", "json", "orjson")
+
+    def __init__(self, path: str | Path, codec: str = "json", compact: bool = False):
+        super().__init__(path)
+        if codec not in self.CODECS:
+            raise ValueError(f"unknown json codec {codec!r}, expected one of {self.CODECS}")
+        self.codec: str = codec
+        # writes without indentation or spaces, for files that are not edited by hand
+        self.compact: bool = compact
+        self._orjson: Any = _MISSING
+
+    @property
+    def orjson(self) -> Any:
+        """the orjson module if this handler uses it, imported on first use"""
+        if self._orjson is _MISSING:
+            self._orjson = None if self.codec == "json" else _optional_module("orjson")
+            if self._orjson is None and self.codec == "orjson":
+                raise ImportError("the orjson codec needs the orjson package")
+        return self._orjson
+
+    def dumps(self, dct: dict, encoder=None) -> str:
+        import json
+
+        if encoder is None and (self.compact or self.codec == "orjson") and self.orjson is not None:
+            option = 0 if self.compact else self.orjson.OPT_INDENT_2
+            try:
+                return self.orjson.dumps(dct, option=option).decode()
+            except TypeError:
+                pass
+        if self.compact:
+            return json.dumps(dct, separators=(",", ":"), cls=encoder)
+        return json.dumps(dct, indent=4, cls=encoder)
+
+    def loads(self, text: str, decoder=None) -> dict:
+        import json
+
+        if decoder is None and self.orjson is not None:
+            try:
+                return self.orjson.loads(text)
+            except self.orjson.JSONDecodeError:
+                pass  # NaN and infinity, or an error reported by the standard library below
+        return json.loads(text, cls=decoder)
 
     def save(self, dct: dict, encoder=None) -> None:
-        self._write(lambda file: json.dump(dct, file, indent=4, cls=encoder))
+        # dumping to a string at once is faster than `json.dump`, which writes the file in small chunks
+        self._write(lambda: self.dumps(dct, encoder))
 
     def load(self, decoder=None) -> dict:
-        return self._read(lambda file: json.load(file, cls=decoder))
+        return self._read(lambda file: self.loads(file.read(), decoder))
 
     def try_serialize(self, object: object) -> bool:
+        import json
+
         try:
             json.dumps(object)
             return True
@@ -52,23 +214,684 @@ class JsonSaveHandler(SaveHandler):
 
 
 class TomlSaveHandler(SaveHandler):
-    """A save handler made to save and load .toml files"""
+    """
+    A save handler made to save and load .toml files, written with the `toml` package.
+    The `codec` can be "toml", "tomllib", or "auto" to read with the standard library's `tomllib` (or `tomli`)
+    when it is available. "auto" reads files `tomllib` rejects with `toml`, and `toml` is used when a decoder is given.
+    """
+
+    suffix = ".toml"
+    CODECS = ("auto", "toml", "tomllib")
+
+    def __init__(self, path: str | Path, codec: str = "auto"):
+        super().__init__(path)
+        if codec not in self.CODECS:
+            raise ValueError(f"unknown toml codec {codec!r}, expected one of {self.CODECS}")
+        self.codec: str = codec
+        self._tomllib: Any = _MISSING
+
+    @property
+    def tomllib(self) -> Any:
+        """the tomllib or tomli module if this handler reads with it, imported on first use"""
+        if self._tomllib is _MISSING:
+            self._tomllib = None if self.codec == "toml" else _optional_module("tomllib") or _optional_module("tomli")
+            if self._tomllib is None and self.codec == "tomllib":
+                raise ImportError("the tomllib codec needs python 3.11 or the tomli package")
+        return self._tomllib
+
+    def dumps(self, dct: dict, encoder: toml.TomlEncoder | None = None) -> str:
+        import toml
+
+        return toml.dumps(dct, encoder=encoder)
+
+    def loads(self, text: str, decoder=None) -> dict:
+        if decoder is None and self.tomllib is not None:
+            try:
+                return self.tomllib.loads(text)
+            except self.tomllib.TOMLDecodeError:
+                if self.codec == "tomllib":
+                    raise
+        import toml
+
+        return toml.loads(text, decoder=decoder)
 
     def save(self, dct: dict, encoder: toml.TomlEncoder | None = None) -> None:
-        self._write(lambda file: toml.dump(dct, file, encoder=encoder))
+        self._write(lambda: self.dumps(dct, encoder))
 
     def load(self, decoder=None) -> dict:
-        return self._read(lambda file: toml.load(file, decoder=decoder))
+        return self._read(lambda file: self.loads(file.read(), decoder))
 
     def try_serialize(self, object: Mapping) -> bool:
+        import toml
+
         try:
-            toml.dumps(object)
-            return True
+            # toml only dumps tables, so values are checked inside one.
+            # values toml has no type for, like None, are dropped without an error
+            return "value" in toml.loads(toml.dumps({"value": object}))
         except (TypeError, OverflowError, ValueError):
             return False
 
 
+class SnapshotSaveHandler(SaveHandler):
+    """
+    Wraps another save handler, keeping a compact `marshal` snapshot next to its file.
+    The snapshot is tagged with the file's (mtime_ns, size, inode), and is only read while the file is unchanged.
+    The wrapped handler's file stays the source of truth.
+    """
+
+    SUFFIX = ".snapshot"
+    FORMAT = 1
+
+    def __init__(self, handler: SaveHandler, decoder=None):
+        self.handler: SaveHandler = handler
+        # the decoder the snapshots written when saving are decoded with, and that of the last load
+        self.decoder = decoder
+
+    @property
+    def path(self) -> Path:
+        return self.handler.path
+
+    @path.setter
+    def path(self, path: str | Path) -> None:
+        self.handler.path = path
+
+    @property
+    def atomic(self) -> bool:
+        return self.handler.atomic
+
+    @atomic.setter
+    def atomic(self, atomic: bool) -> None:
+        self.handler.atomic = atomic
+
+    @property
+    def snapshot_path(self) -> Path:
+        return self.path.with_name(self.path.name + self.SUFFIX)
+
+    def file_stat(self) -> tuple[int, int, int] | None:
+        return self.handler.file_stat()
+
+    def unchanged(self) -> bool:
+        return self.handler.unchanged()
+
+    def watched_paths(self) -> list[Path] | None:
+        return self.handler.watched_paths()
+
+    @property
+    def merges_changes(self) -> bool:  # type: ignore[override]
+        return self.handler.merges_changes
+
+    def save(self, dct: dict, encoder=None) -> None:
+        self.handler.save(dct, encoder)
+        self._save_written(dct, encoder)
+
+    def save_changes(self, dct: dict, keys: Collection, encoder=None) -> None:
+        self.handler.save_changes(dct, keys, encoder)
+        self._save_written(dct, encoder)
+
+    def load(self, decoder=None) -> dict:
+        self.decoder = decoder
+        stat = self.handler.file_stat()
+        try:
+            with timer("SnapshotSaveHandler.deserialize") as timed:
+                data = self.snapshot_path.read_bytes()
+                tag, dct = marshal.loads(data)
+                timed.nbytes = len(data)
+            if stat is not None and tag == self._tag(stat, decoder):
+                self.handler._stat = stat
+                return dct
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+        dct = self.handler.load(decoder)
+        self._save_snapshot(dct, decoder)
+        return dct
+
+    def try_serialize(self, object: object) -> bool:
+        return self.handler.try_serialize(object)
+
+    def _tag(self, stat: tuple[int, int, int] | None, decoder) -> tuple:
+        # the snapshot holds the decoded data, so it is only valid for the same decoder
+        decoder_name = f"{decoder.__module__}.{decoder.__qualname__}" if decoder is not None else None
+        return (self.FORMAT, stat, decoder_name)
+
+    def _save_written(self, dct: dict, encoder) -> None:
+        """
+        snapshots the dict as loading the file would return it, e.g. with tuples as lists and keys as strings.
+        Handlers that can't round trip a dict in memory leave the snapshot to their next load
+        """
+        dumps, loads = getattr(self.handler, "dumps", None), getattr(self.handler, "loads", None)
+        if dumps is None or loads is None or self.handler._stat is None:
+            return
+        try:
+            with timer("SnapshotSaveHandler.round_trip"):
+                dct = loads(dumps(dct, encoder), self.decoder)
+        except Exception:
+            return
+        self._save_snapshot(dct, self.decoder)
+
+    def _save_snapshot(self, dct: dict, decoder) -> None:
+        stat = self.handler._stat
+        if stat is None:
+            return
+        try:
+            with timer("SnapshotSaveHandler.serialize") as timed:
+                data = marshal.dumps((self._tag(stat, decoder), dct))
+                timed.nbytes = len(data)
+        except ValueError:  # the dict contains objects marshal does not support
+            return
+        # the snapshot is only a cache, so failing to write it is not an error
+        import tempfile
+
+        snapshot_path = self.snapshot_path
+        try:
+            fd, tmp = tempfile.mkstemp(prefix=f".{snapshot_path.name}.", suffix=".tmp", dir=snapshot_path.parent)
+        except OSError:
+            return
+        try:
+            with open(fd, "wb") as file:
+                file.write(data)
+            os.replace(tmp, snapshot_path)
+        except OSError:
+            os.unlink(tmp)
+
+
+class JournalSaveHandler(SaveHandler):
+    """
+    Wraps another save handler, appending the keys changed by `save_changes` to a journal next to its file
+    (`<file>.journal`) instead of rewriting it. Every line of the journal holds the changes of one save,
+    as json `[[key, value], [deleted key], ...]`, and is replayed over the file when loading.
+    Once the journal passes `max_bytes` or `max_records` lines, the next save compacts it into the file.
+    A line cut short by a crash is dropped with the rest of its save. The journal starts with the stat of the file
+    it applies to, and is ignored once the file is replaced by something else.
+    """
+
+    SUFFIX = ".journal"
+    FORMAT = 1
+
+    def __init__(self, handler: SaveHandler, max_bytes: int = 1 << 20, max_records: int = 1000):
+        self.handler: SaveHandler = handler
+        self._stat: tuple[int, int, int] | None = None
+        self.max_bytes: int = max_bytes
+        self.max_records: int = max_records
+        # flushes every line to the disk before the save returns
+        self.fsync: bool = False
+        # the number of lines and bytes of the journal while it can be appended to, or None until the next full save
+        self._records: int | None = None
+        self._bytes: int = 0
+
+    @property
+    def path(self) -> Path:
+        return self.handler.path
+
+    @path.setter
+    def path(self, path: str | Path) -> None:
+        self.handler.path = path
+        self._stat = None
+        self._records = None
+
+    @property
+    def atomic(self) -> bool:
+        return self.handler.atomic
+
+    @atomic.setter
+    def atomic(self, atomic: bool) -> None:
+        self.handler.atomic = atomic
+
+    @property
+    def journal_path(self) -> Path:
+        return self.path.with_name(self.path.name + self.SUFFIX)
+
+    def file_stat(self) -> tuple[int, int, int] | None:
+        """the stat of the file, including the changes in its journal"""
+        stat = self.handler.file_stat()
+        if stat is None:
+            return None
+        try:
+            journal = os.stat(self.journal_path)
+        except OSError:
+            return stat
+        return (max(stat[0], journal.st_mtime_ns), stat[1] + journal.st_size, stat[2])
+
+    def watched_paths(self) -> list[Path] | None:
+        paths = self.handler.watched_paths()
+        return None if paths is None else [*paths, self.journal_path]
+
+    def save(self, dct: dict, encoder=None) -> None:
+        self._records = None
+        self.handler.save(dct, encoder)
+        self._start_journal()
+        self._stat = self.file_stat()
+
+    def save_changes(self, dct: dict, keys: Collection, encoder=None) -> None:
+        if self._records is None or self._records >= self.max_records or self._bytes >= self.max_bytes:
+            self.save(dct, encoder)
+            return
+        import json
+
+        try:
+            # only json handlers use the encoder, as it encodes values for their own format
+            line = json.dumps(
+                [[key, dct[key]] if key in dct else [key] for key in keys],
+                separators=(",", ":"),
+                cls=encoder if isinstance(self.handler, JsonSaveHandler) else None,
+            )
+        except (TypeError, ValueError, OverflowError):
+            # values json can't hold are saved to the file
+            self.save(dct, encoder)
+            return
+        data = f"{line}\n".encode()
+        with timer("JournalSaveHandler.serialize") as timed:
+            self._stat = None
+            try:
+                fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND)
+            except FileNotFoundError:
+                self.save(dct, encoder)
+                return
+            try:
+                os.write(fd, data)
+                if self.fsync:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._records += 1
+            self._bytes += len(data)
+            self._stat = self.file_stat()
+            timed.nbytes = len(data)
+
+    def load(self, decoder=None) -> dict:
+        stat = self.file_stat()
+        dct = self.handler.load(decoder)
+        with timer("JournalSaveHandler.deserialize") as timed:
+            self._records = None
+            try:
+                with open(self.journal_path, "rb") as file:
+                    data = file.read()
+            except OSError:
+                data = b""
+            timed.nbytes = len(data)
+            self._replay(dct, data, decoder)
+        self._stat = stat
+        return dct
+
+    def try_serialize(self, object: object) -> bool:
+        return self.handler.try_serialize(object)
+
+    def _header(self) -> bytes:
+        import json
+
+        return (json.dumps({"journal": self.FORMAT, "file": self.handler.file_stat()}) + "\n").encode()
+
+    def _start_journal(self) -> None:
+        """replaces the journal with an empty one for the current contents of the file"""
+        header = self._header()
+        with open(self.journal_path, "wb") as file:
+            file.write(header)
+        self._records = 0
+        self._bytes = len(header)
+
+    def _replay(self, dct: dict, data: bytes, decoder) -> None:
+        import json
+
+        header, _, body = data.partition(b"\n")
+        if header + b"\n" != self._header():
+            # missing, or written for other contents of the file, which hold its changes if it was compacted.
+            # the next save replaces it
+            return
+        # the text after the last newline is empty, or a line cut short by a crash
+        *lines, tail = body.split(b"\n")
+        decoder = decoder if isinstance(self.handler, JsonSaveHandler) else None
+        try:
+            saves = json.loads(b"[" + b",".join(lines) + b"]", cls=decoder)
+        except ValueError:
+            # read line by line, up to the one that is damaged
+            saves = []
+            for line in lines:
+                try:
+                    saves.append(json.loads(line, cls=decoder))
+                except ValueError:
+                    break
+        for changes in saves:
+            for change in changes:
+                if len(change) == 2:
+                    dct[change[0]] = change[1]
+                else:
+                    dct.pop(change[0], None)
+        if len(saves) == len(lines) and not tail:
+            self._records = len(saves)
+            self._bytes = len(data)
+        # otherwise the next line would be appended to the one cut short, so the next save replaces the journal
+
+
+def _marshal_key(dct: dict) -> bytes | None:
+    """a compact representation of a dict telling apart values that compare equal, like 1 and True"""
+    try:
+        return marshal.dumps(dct)
+    except ValueError:
+        return None
+
+
+class DirectorySaveHandler(SaveHandler):
+    """
+    Saves a dict to a directory with a file per section, so saving rewrites only the sections that changed.
+    Top-level keys holding dicts are saved to `<key>.json`, and sections nested up to `depth` levels become
+    subdirectories, like the dotted keys of `ArgparseConfig`. The other values of each level go to `__root__.json`.
+    Files are written one by one, so a save interrupted halfway can leave some sections older than others.
+    """
+
+    ROOT = "__root__"
+
+    def __init__(self, path: str | Path, save_mode: str = "json", depth: int = 1):
+        super().__init__(path)
+        # serializes the sections, which are all saved in its format
+        self.format: JsonSaveHandler | TomlSaveHandler = HANDLERS[save_mode](path)  # type: ignore
+        assert hasattr(self.format, "dumps")
+        self.depth: int = depth
+        # the (mtime_ns, size, inode), text and marshalled contents of every section file
+        # when it was last read or written, by relative path
+        self._files: dict[str, tuple[tuple[int, int, int], str, bytes | None]] = {}
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @path.setter
+    def path(self, path: str | Path) -> None:
+        self._path = Path(path)
+        self._stat = None
+        self._files = {}
+
+    def file_stat(self) -> tuple[int, int, int] | None:
+        """returns the latest mtime_ns, the total size and the sum of the inodes of the directory's files"""
+        return self._combined_stat(self._scan(self.path, self.depth))
+
+    def watched_paths(self) -> list[Path] | None:
+        # the files are spread over subdirectories that come and go
+        return None
+
+    def save(self, dct: dict, encoder=None) -> None:
+        with timer("DirectorySaveHandler.serialize") as timed:
+            self._stat = None
+            sections = self._split(dct, self.depth)
+            existing = self._scan(self.path, self.depth)
+            written = 0
+            self.path.mkdir(parents=True, exist_ok=True)
+            for rel, section in sections.items():
+                cached = self._files.get(rel)
+                if cached is not None and existing.get(rel) != cached[0]:
+                    cached = None  # changed by something else since
+                # comparing marshalled sections skips serializing the unchanged ones
+                key = _marshal_key(section)
+                if cached is not None and key is not None and key == cached[2]:
+                    continue
+                text = self.format.dumps(section, encoder)
+                if cached is not None and text == cached[1]:
+                    continue
+                path = self.path / rel
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self._write_file(path, text)
+                stat = path.stat()
+                self._files[rel] = ((stat.st_mtime_ns, stat.st_size, stat.st_ino), text, key)
+                written += stat.st_size
+
+            for rel in existing.keys() - sections.keys():
+                os.unlink(self.path / rel)
+                self._files.pop(rel, None)
+                # removes the directories of deleted sections
+                parent = (self.path / rel).parent
+                while parent != self.path and not any(parent.iterdir()):
+                    parent.rmdir()
+                    parent = parent.parent
+            self._stat = self.file_stat()
+            timed.nbytes = written
+
+    def load(self, decoder=None) -> dict:
+        with timer("DirectorySaveHandler.deserialize") as timed:
+            files = self._scan(self.path, self.depth)
+            stat = self._combined_stat(files)
+            self._files = {}
+            dct = self._read_files(files, decoder)
+            timed.nbytes = stat[1] if stat is not None else 0
+        self._stat = stat
+        return dct
+
+    def load_section(self, key: str, decoder=None) -> Any:
+        """reads the value of a dotted key (e.g. `train.optimizer`) from its own file, without reading the others"""
+        suffix = self.format.suffix
+        parts = key.split(".")
+        for i in range(min(len(parts), self.depth), 0, -1):
+            rel = "/".join(parts[:i])
+            if i < self.depth and (self.path / rel).is_dir():
+                value = self._read_files(self._scan(self.path / rel, self.depth - i, f"{rel}/"), decoder, f"{rel}/")
+            elif (self.path / (rel + suffix)).is_file():
+                prefix = "/".join(parts[: i - 1]) + "/" if i > 1 else ""
+                value = self._read_files(self._scan_file(rel + suffix), decoder, prefix)[parts[i - 1]]
+            else:
+                continue
+            for part in parts[i:]:
+                value = value[part]
+            return value
+
+        # values that are not sections are in the root file of their level
+        for i in range(min(len(parts) - 1, self.depth - 1), -1, -1):
+            rel = "/".join([*parts[:i], self.ROOT + suffix])
+            if (self.path / rel).is_file():
+                value = self._read_files(self._scan_file(rel), decoder, "/".join(parts[:i]) + "/" if i else "")
+                for part in parts[i:]:
+                    value = value[part]
+                return value
+        raise KeyError(key)
+
+    def try_serialize(self, object: object) -> bool:
+        return self.format.try_serialize(object)
+
+    def _is_section(self, key, value) -> bool:
+        return (
+            isinstance(value, dict)
+            and isinstance(key, str)
+            and key not in ("", self.ROOT)
+            and "/" not in key
+            and os.sep not in key
+            and not key.startswith(".")
+        )
+
+    def _split(self, dct: dict, depth: int, prefix: str = "") -> dict[str, dict]:
+        """maps the relative path of every section file to its contents"""
+        suffix = self.format.suffix
+        files: dict[str, dict] = {}
+        root = {}
+        for key, value in dct.items():
+            if depth > 0 and self._is_section(key, value):
+                if depth > 1:
+                    files.update(self._split(value, depth - 1, f"{prefix}{key}/"))
+                else:
+                    files[f"{prefix}{key}{suffix}"] = value
+            else:
+                root[key] = value
+        if root or prefix:
+            # the sections of subdirectories always have a root file, so empty sections are loaded again
+            files[f"{prefix}{self.ROOT}{suffix}"] = root
+        return files
+
+    def _scan(self, directory: Path, depth: int, prefix: str = "") -> dict[str, tuple[int, int, int]]:
+        """finds the section files in a directory, returning their (mtime_ns, size, inode) by relative path"""
+        found = {}
+        try:
+            entries = list(os.scandir(directory))
+        except (FileNotFoundError, NotADirectoryError):
+            return found
+        for entry in entries:
+            # temporary files of atomic writes start with a dot
+            if entry.name.startswith("."):
+                continue
+            if entry.name.endswith(self.format.suffix) and entry.is_file():
+                stat = entry.stat()
+                found[prefix + entry.name] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+            elif depth > 1 and entry.is_dir():
+                found.update(self._scan(Path(entry.path), depth - 1, f"{prefix}{entry.name}/"))
+        return found
+
+    def _scan_file(self, rel: str) -> dict[str, tuple[int, int, int]]:
+        stat = (self.path / rel).stat()
+        return {rel: (stat.st_mtime_ns, stat.st_size, stat.st_ino)}
+
+    def _combined_stat(self, files: dict[str, tuple[int, int, int]]) -> tuple[int, int, int] | None:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+        stats = files.values()
+        return (
+            max([mtime, *(stat[0] for stat in stats)]),
+            sum(stat[1] for stat in stats),
+            sum(stat[2] for stat in stats),
+        )
+
+    def _read_files(self, files: dict[str, tuple[int, int, int]], decoder, prefix: str = "") -> dict:
+        """reads section files into a nested dict, relative to the directory `prefix`"""
+        root_name = self.ROOT + self.format.suffix
+        out: dict = {}
+        # root files are read before the sections of their level, which take precedence
+        for rel in sorted(files, key=lambda rel: (rel.count("/"), rel.rsplit("/", 1)[-1] != root_name)):
+            text = (self.path / rel).read_text(encoding="utf-8")
+            data = self.format.loads(text, decoder)
+            self._files[rel] = (files[rel], text, _marshal_key(data))
+            *directories, name = rel[len(prefix) :].split("/")
+            target = out
+            for directory in directories:
+                if not isinstance(target.get(directory), dict):
+                    target[directory] = {}
+                target = target[directory]
+            if name == root_name:
+                target.update(data)
+            else:
+                target[name[: -len(self.format.suffix)]] = data
+        return out
+
+
+class SqliteSaveHandler(SaveHandler):
+    """
+    Saves a dict to a SQLite database, with a row per top-level key holding its value as json.
+    Saving only the changed keys updates only their rows, and WAL mode lets other processes read while one writes.
+    """
+
+    TABLE = "config"
+    merges_changes = True
+
+    def __init__(self, path: str | Path):
+        super().__init__(path)
+        self._connection: sqlite3.Connection | None = None
+        # the connection is shared with the threads saving in the background
+        self._connection_lock = threading.Lock()
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @path.setter
+    def path(self, path: str | Path) -> None:
+        self.close()
+        self._path = Path(path)
+        self._stat = None
+
+    def file_stat(self) -> tuple[int, int, int] | None:
+        """the stat of the database, including the changes in its write-ahead log that are not checkpointed yet"""
+        stat = super().file_stat()
+        if stat is None:
+            return None
+        try:
+            wal = os.stat(f"{self.path}-wal")
+        except OSError:
+            return stat
+        return (max(stat[0], wal.st_mtime_ns), stat[1] + wal.st_size, stat[2])
+
+    def watched_paths(self) -> list[Path] | None:
+        # sqlite keeps the database and its write-ahead log open between writes
+        return None
+
+    def close(self) -> None:
+        with self._connection_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def save(self, dct: dict, encoder=None) -> None:
+        self._write_rows(dct, (), encoder, replace=True)
+
+    def save_changes(self, dct: dict, keys: Collection, encoder=None) -> None:
+        changed = {key: dct[key] for key in keys if key in dct}
+        self._write_rows(changed, [key for key in keys if key not in dct], encoder)
+
+    def load(self, decoder=None) -> dict:
+        import json
+
+        stat = self.file_stat()
+        with timer("SqliteSaveHandler.deserialize") as timed, self._connection_lock:
+            rows = self._connect().execute(f"SELECT key, value FROM {self.TABLE} ORDER BY rowid").fetchall()
+            dct = {key: json.loads(value, cls=decoder) for key, value in rows}
+            timed.nbytes = sum(len(value) for _, value in rows)
+        self._stat = stat
+        return dct
+
+    def try_serialize(self, object: object) -> bool:
+        import json
+
+        try:
+            json.dumps(object)
+            return True
+        except (TypeError, OverflowError):
+            return False
+
+    def export_to(self, path: str | Path, decoder=None) -> None:
+        """writes the contents of the database to a json or toml file"""
+        path = Path(path)
+        HANDLERS["toml" if path.suffix == ".toml" else "json"](path).save(self.load(decoder))
+
+    def import_from(self, path: str | Path, encoder=None) -> None:
+        """replaces the contents of the database with the contents of a json or toml file"""
+        path = Path(path)
+        self.save(HANDLERS["toml" if path.suffix == ".toml" else "json"](path).load(), encoder)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            import sqlite3
+
+            # transactions are managed by _write_rows
+            connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(f"CREATE TABLE IF NOT EXISTS {self.TABLE} (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._connection = connection
+        return self._connection
+
+    def _write_rows(self, updated: Mapping, deleted: Collection, encoder=None, replace: bool = False) -> None:
+        import json
+
+        with timer("SqliteSaveHandler.serialize") as timed:
+            self._stat = None
+            rows = [(key, json.dumps(value, cls=encoder)) for key, value in updated.items()]
+            with self._connection_lock:
+                connection = self._connect()
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    if replace:
+                        connection.execute(f"DELETE FROM {self.TABLE}")
+                    else:
+                        connection.executemany(f"DELETE FROM {self.TABLE} WHERE key = ?", [(key,) for key in deleted])
+                    connection.executemany(
+                        f"INSERT INTO {self.TABLE} (key, value) VALUES (?, ?)"
+                        " ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                        rows,
+                    )
+                    connection.execute("COMMIT")
+                except BaseException:
+                    connection.execute("ROLLBACK")
+                    raise
+            self._stat = self.file_stat()
+            timed.nbytes = sum(len(value) for _, value in rows)
+
+
 HANDLERS: dict[str, type[SaveHandler]] = {
     "json": JsonSaveHandler,
     "toml": TomlSaveHandler,
+    "directory": DirectorySaveHandler,
+    "sqlite": SqliteSaveHandler,
 }
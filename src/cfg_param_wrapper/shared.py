@@ -0,0 +1,150 @@
+"""Publishes the contents of a CfgDict to shared memory, so worker processes can read them without the file."""
+from __future__ import annotations
+
+import marshal
+import struct
+import time
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .cfg_dict import CfgDict
+
+# a sequence number that is odd while the contents are written, and the length of the contents
+_HEADER = struct.Struct("QQ")
+# the pid of the publisher's resource tracker, which removes the memory if the publisher dies without closing it
+_TRACKER = struct.Struct("q")
+_PAYLOAD = _HEADER.size + _TRACKER.size
+
+
+def _tracker_pid() -> int | None:
+    from multiprocessing import resource_tracker
+
+    return getattr(resource_tracker._resource_tracker, "_pid", None)
+
+
+def _shares_tracker(publisher_tracker: int) -> bool:
+    """whether this process uses the resource tracker of the process that published the memory"""
+    from multiprocessing import resource_tracker
+
+    pid = _tracker_pid()
+    if pid is not None:
+        return pid == publisher_tracker
+    # workers started with spawn inherit the tracker's pipe, but not its pid
+    return getattr(resource_tracker._resource_tracker, "_fd", None) is not None
+
+
+class SharedConfig:
+    """
+    A block of shared memory holding the path and contents of a CfgDict, serialized with `marshal`.
+    The process that publishes it writes new contents with `update`, and the processes that attach to it
+    read them with `read`, or copy them into their own CfgDict with `cfg_dict` and `refresh`.
+    Readers retry while a write is in progress, so they never lock or see partial contents.
+    """
+
+    def __init__(self, memory: shared_memory.SharedMemory, owner: bool = False):
+        self.memory: shared_memory.SharedMemory = memory
+        # the owner created the memory and removes it when closed
+        self.owner: bool = owner
+        self._read_sequence: int = -1
+
+    @classmethod
+    def publish(cls, cfg_dict: CfgDict, name: str | None = None, size: int | None = None) -> SharedConfig:
+        """
+        creates shared memory holding the contents of a CfgDict. `size` is the most bytes later updates can take,
+        by default twice the size of the current contents
+        """
+        payload = cls._serialize(cfg_dict)
+        size = max(size or 2 * len(payload), len(payload)) + _PAYLOAD
+        shared = cls(shared_memory.SharedMemory(name, create=True, size=size), owner=True)
+        _TRACKER.pack_into(shared.memory.buf, _HEADER.size, _tracker_pid() or 0)
+        shared._write(payload)
+        return shared
+
+    @classmethod
+    def attach(cls, name: str) -> SharedConfig:
+        """attaches to shared memory published by another process"""
+        try:
+            memory = shared_memory.SharedMemory(name, track=False)  # type: ignore
+        except TypeError:
+            # python < 3.13 tracks every attached block, and removes it when the process exits.
+            # workers share the tracker of the process that started them, which must keep tracking the block
+            memory = shared_memory.SharedMemory(name)
+            if not _shares_tracker(_TRACKER.unpack_from(memory.buf, _HEADER.size)[0]):
+                from multiprocessing import resource_tracker
+
+                resource_tracker.unregister(memory._name, "shared_memory")  # type: ignore
+        return cls(memory)
+
+    @property
+    def name(self) -> str:
+        """the name other processes attach with"""
+        return self.memory.name
+
+    @property
+    def version(self) -> int:
+        """the number of times the contents were published"""
+        return _HEADER.unpack_from(self.memory.buf)[0] // 2
+
+    def changed(self) -> bool:
+        """whether the contents were published again since they were last read by this process"""
+        return _HEADER.unpack_from(self.memory.buf)[0] != self._read_sequence
+
+    def update(self, cfg_dict: CfgDict) -> None:
+        """publishes the current contents of a CfgDict"""
+        self._write(self._serialize(cfg_dict))
+
+    def read(self) -> tuple[str, dict]:
+        """returns the path and the contents of the published CfgDict"""
+        buf = self.memory.buf
+        while True:
+            sequence, length = _HEADER.unpack_from(buf)
+            if sequence % 2:
+                time.sleep(0)  # a write is in progress
+                continue
+            payload = bytes(buf[_PAYLOAD : _PAYLOAD + length])
+            if _HEADER.unpack_from(buf)[0] == sequence:
+                self._read_sequence = sequence
+                return marshal.loads(payload)
+
+    def cfg_dict(self, **kwargs) -> CfgDict:
+        """makes a CfgDict holding the published contents, without reading its file"""
+        from .cfg_dict import CfgDict
+
+        path, contents = self.read()
+        return CfgDict(path, contents, start_empty=True, **kwargs)
+
+    def refresh(self, cfg_dict: CfgDict) -> bool:
+        """replaces the contents of a CfgDict with the published ones if they changed, and returns whether they did"""
+        if not self.changed():
+            return False
+        _, contents = self.read()
+        cfg_dict._replace_contents(contents)
+        return True
+
+    def close(self) -> None:
+        """detaches from the shared memory, and removes it if this process published it"""
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+    def __enter__(self) -> SharedConfig:
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    @staticmethod
+    def _serialize(cfg_dict: CfgDict) -> bytes:
+        return marshal.dumps((str(Path(cfg_dict.cfg_path)), dict(cfg_dict.snapshot())))
+
+    def _write(self, payload: bytes) -> None:
+        buf = self.memory.buf
+        if _PAYLOAD + len(payload) > len(buf):
+            raise ValueError(f"the config takes {len(payload)} bytes, but only {len(buf) - _PAYLOAD} were reserved")
+        sequence = _HEADER.unpack_from(buf)[0]
+        # readers retry while the sequence is odd, or if it changed while they read
+        _HEADER.pack_into(buf, 0, sequence + 1, 0)
+        buf[_PAYLOAD : _PAYLOAD + len(payload)] = payload
+        _HEADER.pack_into(buf, 0, sequence + 2, len(payload))
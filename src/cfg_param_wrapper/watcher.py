@@ -0,0 +1,155 @@
+"""A background watcher that reloads a CfgDict when its file is changed by something else."""
+from __future__ import annotations
+
+import os
+import select
+import struct
+import threading
+from collections.abc import Callable, Iterable
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .cfg_dict import CfgDict
+
+# {key: (old value, new value)}, with None as the old value of new keys and the new value of removed ones
+Changes = dict
+Callback = Callable[["CfgDict", Changes], None]
+
+# from <sys/inotify.h>
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+
+def _inotify_watch(directory: str) -> int | None:
+    """
+    returns an inotify file descriptor watching the files written or moved into a directory,
+    or None if inotify is unavailable
+    """
+    try:
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    # the directory is watched instead of the file, as atomic saves replace the file with a new one
+    if libc.inotify_add_watch(fd, os.fsencode(directory), _IN_CLOSE_WRITE | _IN_MOVED_TO) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _event_names(data: bytes) -> Iterable[str]:
+    offset = 0
+    while offset + _EVENT.size <= len(data):
+        _, _, _, length = _EVENT.unpack_from(data, offset)
+        offset += _EVENT.size
+        yield os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+        offset += length
+
+
+class ConfigWatcher:
+    """
+    Reloads a CfgDict from a background thread whenever its file changes, and calls the callbacks
+    registered for the keys that changed. Uses inotify where it is available, and polls the file's stat otherwise,
+    or when the save handler writes files that can't be watched by name (see `SaveHandler.watched_paths`).
+    Reloading never saves, and replaces the values of the keys in the file like `CfgDict.load`.
+    """
+
+    def __init__(self, cfg_dict: CfgDict, poll_interval: float = 1.0, use_inotify: bool = True):
+        self.cfg_dict: CfgDict = cfg_dict
+        self.poll_interval: float = poll_interval
+        self.use_inotify: bool = use_inotify
+        self._callbacks: list[tuple[Callback, frozenset | None]] = []
+        self._stop = threading.Event()
+        self._wakeup: tuple[int, int] | None = None
+        self._thread: threading.Thread | None = None
+        self.inotify: bool = False
+        # the stat of a file that failed to load, which is not retried until it changes
+        self._failed_stat: tuple[int, int, int] | None = None
+
+    def on_change(self, callback: Callback, keys: Iterable[str] | None = None) -> Callback:
+        """
+        registers `callback(cfg_dict, changes)` to be called with the changes to the given keys, or to any key.
+        Can be used as a decorator.
+        """
+        self._callbacks.append((callback, frozenset(keys) if keys is not None else None))
+        return callback
+
+    def check(self) -> Changes:
+        """reloads the file if it changed, calls the callbacks and returns the changes"""
+        stat = self.cfg_dict.save_handler.file_stat()
+        if stat is not None and stat == self._failed_stat:
+            return {}
+        try:
+            changes = self.cfg_dict.reload()
+        except Exception:
+            self._failed_stat = stat
+            print(f"[!] failed to load config from {self.cfg_dict.cfg_path}")
+            return {}
+        if changes:
+            for callback, keys in self._callbacks:
+                selected = changes if keys is None else {key: changes[key] for key in keys.intersection(changes)}
+                if selected:
+                    callback(self.cfg_dict, selected)
+        return changes
+
+    def start(self) -> ConfigWatcher:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="cfg-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        wakeup = self._wakeup
+        if wakeup is not None:
+            try:
+                os.write(wakeup[1], b"\0")
+            except OSError:  # the thread already closed it
+                pass
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def __enter__(self) -> ConfigWatcher:
+        return self.start()
+
+    def __exit__(self, *_) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        paths = self.cfg_dict.save_handler.watched_paths() if self.use_inotify else None
+        directories = {os.path.dirname(os.path.abspath(path)) for path in paths or ()}
+        # a single directory is watched, which holds the files of every handler that can be watched
+        fd = _inotify_watch(directories.pop()) if len(directories) == 1 else None
+        self.inotify = fd is not None
+        if fd is None:
+            while not self._stop.wait(self.poll_interval):
+                self.check()
+            return
+
+        names = {os.path.basename(path) for path in paths}
+        self._wakeup = os.pipe()
+        try:
+            while not self._stop.is_set():
+                ready, _, _ = select.select([fd, self._wakeup[0]], [], [])
+                if fd in ready:
+                    try:
+                        data = os.read(fd, 65536)
+                    except BlockingIOError:
+                        continue
+                    if not names.isdisjoint(_event_names(data)):
+                        self.check()
+        finally:
+            os.close(fd)
+            wakeup, self._wakeup = self._wakeup, None
+            os.close(wakeup[0])
+            os.close(wakeup[1])
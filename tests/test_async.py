@@ -0,0 +1,101 @@
+"""`asave` coalescing, and wrapping coroutine functions."""
+import asyncio
+import inspect
+import json
+import time
+
+from cfg_param_wrapper import CfgDict, wrap_config
+
+
+def count_saves(cfg: CfgDict) -> list:
+    """makes every save of the dict slow and records the contents it wrote"""
+    saves = []
+    save = cfg.save
+
+    def slow_save(*args, **kwargs):
+        time.sleep(0.05)
+        saves.append(dict(cfg))
+        return save(*args, **kwargs)
+
+    cfg.save = slow_save
+    return saves
+
+
+def test_asave_burst_saves_at_most_twice(tmp_path):
+    path = tmp_path / "config.json"
+    cfg = CfgDict(path)
+    saves = count_saves(cfg)
+
+    async def main():
+        cfg["a"] = 1
+        first = asyncio.ensure_future(cfg.asave())
+        await asyncio.sleep(0.01)  # the first save is running
+        burst = []
+        for i in range(20):
+            cfg["b"] = i
+            burst.append(asyncio.ensure_future(cfg.asave()))
+            await asyncio.sleep(0)
+        await asyncio.gather(first, *burst)
+
+    asyncio.run(main())
+    assert len(saves) == 2
+    assert saves[-1] == {"a": 1, "b": 19}
+    assert json.loads(path.read_text()) == {"a": 1, "b": 19}
+
+
+def test_asave_after_a_burst_saves_again(tmp_path):
+    path = tmp_path / "config.json"
+    cfg = CfgDict(path)
+    saves = count_saves(cfg)
+
+    async def main():
+        await asyncio.gather(*(cfg.asave() for _ in range(5)))
+        cfg["a"] = 2
+        await cfg.asave()
+
+    asyncio.run(main())
+    assert len(saves) == 3
+    assert json.loads(path.read_text()) == {"a": 2}
+
+
+def test_asave_does_not_block_the_loop(tmp_path):
+    cfg = CfgDict(tmp_path / "config.json")
+    saves = count_saves(cfg)
+
+    async def main():
+        save = asyncio.ensure_future(cfg.asave())
+        await asyncio.sleep(0.01)
+        assert not save.done()  # the loop ran while the file was being saved
+        await save
+
+    asyncio.run(main())
+    assert len(saves) == 1
+
+
+def test_aload(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"a": 1}))
+    cfg = asyncio.run(CfgDict(path).aload())
+    assert dict(cfg) == {"a": 1}
+
+
+def test_wrapped_coroutine_function(tmp_path):
+    cfg = CfgDict(tmp_path / "config.json", save_on_change=True)
+
+    async def run(scale: int = 2, name: str = "x"):
+        await asyncio.sleep(0)
+        return scale, name
+
+    wrapped = wrap_config(cfg)(run)
+    assert inspect.iscoroutinefunction(wrapped)
+    assert asyncio.run(wrapped()) == (2, "x")
+    cfg["scale"] = 5
+    assert asyncio.run(wrapped()) == (5, "x")
+    assert asyncio.run(wrapped(name="y")) == (5, "y")
+
+
+def test_wrapped_function_stays_sync(tmp_path):
+    cfg = CfgDict(tmp_path / "config.json")
+    wrapped = wrap_config(cfg)(lambda scale=2: scale)
+    assert not inspect.iscoroutinefunction(wrapped)
+    assert wrapped() == 2
@@ -0,0 +1,94 @@
+"""Threads reading and writing a concurrent CfgDict."""
+import json
+import threading
+import time
+
+import pytest
+
+from cfg_param_wrapper import CfgDict, wrap_config
+
+READERS = 6
+WRITERS = 4
+DURATION = 0.3
+
+
+def run_threads(targets) -> list[BaseException]:
+    """runs the targets until DURATION passed, and returns the errors they raised"""
+    stop = threading.Event()
+    errors: list[BaseException] = []
+
+    def run(target):
+        try:
+            while not stop.is_set():
+                target()
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(target,)) for target in targets]
+    for thread in threads:
+        thread.start()
+    time.sleep(DURATION)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+@pytest.mark.parametrize("save_on_change", [False, True])
+def test_readers_see_whole_updates(tmp_path, save_on_change):
+    path = tmp_path / "config.json"
+    cfg = CfgDict(path, {"a": 0, "b": 0}, concurrent=True, save_on_change=save_on_change)
+
+    @wrap_config(cfg)
+    def total(a=0, b=0):
+        return a + b
+
+    def reader():
+        snapshot = cfg.snapshot()
+        assert snapshot["a"] + snapshot["b"] == 0
+        assert total() == 0
+
+    def writer(idx):
+        counter = iter(range(1 << 30))
+
+        def write():
+            i = next(counter)
+            # every update keeps a + b == 0, and the other keys come and go
+            cfg.update({"a": i, "b": -i})
+            cfg[f"key{idx}_{i % 50}"] = i
+            if i % 7 == 0:
+                cfg.pop(f"key{idx}_{(i - 1) % 50}", None)
+
+        return write
+
+    errors = run_threads([reader] * READERS + [writer(idx) for idx in range(WRITERS)])
+    assert errors == []
+    if save_on_change:
+        # every write is followed by its own save, so the last save holds every write
+        assert json.loads(path.read_text()) == dict(cfg)
+
+
+def test_batch_rollback_keeps_other_threads_writes(tmp_path):
+    cfg = CfgDict(tmp_path / "config.json", {"a": 0}, concurrent=True)
+    in_batch = threading.Event()
+
+    def rolled_back():
+        try:
+            with cfg.batch():
+                cfg["a"] = 1
+                in_batch.set()
+                time.sleep(0.1)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+    def other():
+        in_batch.wait()
+        cfg["b"] = 2
+
+    threads = [threading.Thread(target=rolled_back), threading.Thread(target=other)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert dict(cfg) == {"a": 0, "b": 2}
@@ -0,0 +1,24 @@
+"""Read-only records of config values."""
+import pickle
+
+from cfg_param_wrapper import CfgDict, freeze
+
+
+def test_keys_that_are_not_identifiers(tmp_path):
+    cfg = CfgDict(tmp_path / "config.json", {1: "x", "class": 2, "_private": 3, "train": {2: 4}})
+    frozen = cfg.freeze()
+    assert frozen[1] == "x"
+    assert frozen["class"] == 2
+    assert frozen["_private"] == 3
+    assert frozen.train[2] == 4
+    assert frozen._asdict() == {1: "x", "class": 2, "_private": 3, "train": {2: 4}}
+    assert pickle.loads(pickle.dumps(frozen)) == frozen
+
+
+def test_records_are_cached_until_changed(tmp_path):
+    cfg = CfgDict(tmp_path / "config.json", {"a": [1, 2]})
+    frozen = cfg.freeze()
+    assert frozen.a == (1, 2)
+    assert cfg.freeze() is frozen
+    cfg["a"] = 3
+    assert cfg.freeze() == freeze({"a": 3})
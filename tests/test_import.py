@@ -0,0 +1,33 @@
+"""Importing the package must not import the modules its features load lazily."""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import cfg_param_wrapper
+
+LAZY = ["toml", "json", "argparse", "inspect", "tomllib"]
+SRC = Path(cfg_param_wrapper.__file__).parent.parent
+
+
+def imported_after(statement: str) -> list[str]:
+    """runs a statement in a fresh interpreter, returning which of the lazy modules it imported"""
+    code = f"import sys\n{statement}\nprint(' '.join(name for name in {LAZY!r} if name in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONPATH": str(SRC)},
+    )
+    return result.stdout.split()
+
+
+@pytest.mark.parametrize(
+    "statement",
+    ["import cfg_param_wrapper", "import cfg_param_wrapper; cfg_param_wrapper.CfgDict"],
+)
+def test_lazy_imports(statement):
+    assert imported_after(statement) == []
@@ -0,0 +1,96 @@
+"""Saving only the changed keys, and what is read back after other writers or a crash."""
+import json
+
+from cfg_param_wrapper import CfgDict
+from cfg_param_wrapper.save_handlers import SqliteSaveHandler
+
+
+def test_sqlite_changes_keep_other_writers_keys(tmp_path):
+    path = tmp_path / "config.db"
+    a = CfgDict(path, save_mode="sqlite", save_on_change=True)
+    b = CfgDict(path, save_mode="sqlite", save_on_change=True)
+    a["x"] = 1
+    b["y"] = 2
+    a["z"] = 3
+    del b["y"]
+    b["w"] = 4
+    assert SqliteSaveHandler(path).load() == {"x": 1, "z": 3, "w": 4}
+
+
+def test_sqlite_full_save_replaces_the_table(tmp_path):
+    path = tmp_path / "config.db"
+    a = CfgDict(path, save_mode="sqlite", save_on_change=True)
+    b = CfgDict(path, save_mode="sqlite", save_on_change=True)
+    a["x"] = 1
+    b["y"] = 2
+    a.save()
+    assert SqliteSaveHandler(path).load() == {"x": 1}
+
+
+def read_journal(path) -> list:
+    """the saves in the journal of a file, failing on a damaged line"""
+    header, *lines = (path.parent / f"{path.name}.journal").read_bytes().split(b"\n")
+    assert lines.pop() == b""
+    return [json.loads(line) for line in lines]
+
+
+def test_journal_cut_short_replays_complete_saves(tmp_path):
+    path = tmp_path / "config.json"
+    cfg = CfgDict(path, journal=True, save_on_change=True)
+    cfg["a"] = 1
+    cfg["b"] = 2
+    cfg["b"] = 3
+    with open(path.parent / f"{path.name}.journal", "ab") as file:
+        file.write(b'[["c",4')  # a save cut short by a crash
+
+    loaded = CfgDict(path, journal=True).load()
+    assert dict(loaded) == {"a": 1, "b": 3}
+    # appending would continue the damaged line, so the next save rewrites the file and the journal
+    loaded["d"] = 5
+    loaded.save(changes_only=True)
+    assert json.loads(path.read_text()) == {"a": 1, "b": 3, "d": 5}
+    assert read_journal(path) == []
+    loaded["e"] = 6
+    loaded.save(changes_only=True)
+    assert read_journal(path) == [[["e", 6]]]
+    assert CfgDict(path, journal=True).load() == {"a": 1, "b": 3, "d": 5, "e": 6}
+
+
+def test_journal_damaged_line_stops_the_replay(tmp_path):
+    path = tmp_path / "config.json"
+    cfg = CfgDict(path, journal=True, save_on_change=True)
+    cfg["a"] = 1
+    cfg["b"] = 1
+    with open(path.parent / f"{path.name}.journal", "ab") as file:
+        file.write(b'[["a",\n[["b",2]]\n')
+
+    loaded = CfgDict(path, journal=True).load()
+    assert dict(loaded) == {"a": 1, "b": 1}
+    loaded["c"] = 3
+    loaded.save(changes_only=True)
+    assert json.loads(path.read_text()) == {"a": 1, "b": 1, "c": 3}
+    assert read_journal(path) == []
+    assert CfgDict(path, journal=True).load() == {"a": 1, "b": 1, "c": 3}
+
+
+def test_stale_journal_is_ignored_and_replaced(tmp_path):
+    path = tmp_path / "config.json"
+    cfg = CfgDict(path, journal=True, save_on_change=True)
+    cfg["a"] = 1
+    cfg["b"] = 2
+    # another program rewrites the file, so the journal applies to contents that are gone
+    path.write_text(json.dumps({"a": 10, "z": 0}))
+
+    loaded = CfgDict(path, journal=True).load()
+    assert dict(loaded) == {"a": 10, "z": 0}
+    loaded["c"] = 3
+    loaded.save(changes_only=True)
+    assert json.loads(path.read_text()) == {"a": 10, "z": 0, "c": 3}
+    assert read_journal(path) == []
+    assert CfgDict(path, journal=True).load() == {"a": 10, "z": 0, "c": 3}
+
+    # the first dict's next change is a full save, as the file changed since it was synced
+    cfg["d"] = 4
+    assert json.loads(path.read_text()) == {"a": 1, "b": 2, "d": 4}
+    assert read_journal(path) == []
+    assert CfgDict(path, journal=True).load() == {"a": 1, "b": 2, "d": 4}
@@ -0,0 +1,21 @@
+"""Workers reading a CfgDict published to shared memory."""
+from cfg_param_wrapper import CfgDict, SharedConfig, wrap_config
+
+
+def test_refresh_replaces_contents(tmp_path):
+    cfg = CfgDict(tmp_path / "config.json", {"a": 1, "b": 2})
+    with cfg.share() as shared, SharedConfig.attach(shared.name) as attached:
+        worker = attached.cfg_dict()
+
+        @wrap_config(worker)
+        def f(b=0):
+            return b
+
+        assert f() == 2
+        del cfg["b"]
+        cfg["c"] = 3
+        shared.update(cfg)
+        assert attached.refresh(worker)
+        assert dict(worker) == {"a": 1, "c": 3}
+        assert f() == 0
+        assert not attached.refresh(worker)
@@ -0,0 +1,138 @@
+"""`single_pass=True` has to parse, fail, and change the config the same way as the default mode."""
+import contextlib
+import io
+import json
+import sys
+from argparse import ArgumentParser
+
+import pytest
+
+from cfg_param_wrapper import ArgparseConfig
+
+
+def nested_parser() -> ArgumentParser:
+    parser = ArgumentParser(prog="prog")
+    parser.add_argument("--scale", type=int, default=4)
+    parser.add_argument("--name", default="x")
+    parser.add_argument("--flag", action="store_true")
+    parser.add_argument("--mode", choices=["a", "b"], default="a")
+    parser.add_argument("--need", required=True)
+    subparsers = parser.add_subparsers(dest="cmd")
+    train = subparsers.add_parser("train")
+    train.add_argument("--lr", type=float, default=0.1)
+    train.add_argument("--epochs", type=int, default=3)
+    train.add_argument("--req2", required=True)
+    deep = train.add_subparsers(dest="inner").add_parser("deep")
+    deep.add_argument("--depth", type=int, default=2)
+    subparsers.add_parser("eval").add_argument("--metric", default="acc")
+    return parser
+
+
+def default_command_parser() -> ArgumentParser:
+    parser = ArgumentParser(prog="prog")
+    parser.add_argument("--need", required=True)
+    parser.add_argument("--scale", type=int, default="4")
+    subparsers = parser.add_subparsers(dest="cmd")
+    evaluate = subparsers.add_parser("eval")
+    evaluate.add_argument("--metric", default="acc")
+    evaluate.add_argument("--k", type=int, default="5")
+    train = subparsers.add_parser("train")
+    train.add_argument("--lr", type=float, default=0.1)
+    train.add_argument("pos")
+    parser.set_defaults(cmd="eval")
+    return parser
+
+
+def required_default_command_parser() -> ArgumentParser:
+    parser = ArgumentParser(prog="prog")
+    parser.add_argument("--scale", type=int, default=4)
+    subparsers = parser.add_subparsers(dest="cmd")
+    train = subparsers.add_parser("train")
+    train.add_argument("--req", required=True)
+    train.add_argument("pos")
+    subparsers.add_parser("eval")
+    parser.set_defaults(cmd="train")
+    return parser
+
+
+CONFIGS = [
+    {},
+    {"need": "n"},
+    {"need": "n", "train": {"req2": "r", "lr": 0.5}},
+    {"scale": 9, "eval": {"metric": "f1"}},
+]
+ARGVS = [
+    [],
+    ["--need", "q"],
+    ["--need", "q", "--scale", "2"],
+    ["--flag"],
+    ["--mode", "c"],
+    ["--bogus"],
+    ["p1"],
+    ["train"],
+    ["train", "--req2", "z"],
+    ["--need", "q", "train", "--req2", "z", "--lr", "1"],
+    ["--need", "q", "train", "--req2", "z", "deep", "--depth", "5"],
+    ["--need", "n", "train", "--lr", "2"],
+    ["--need", "n", "train", "--lr", "2", "P"],
+    ["eval"],
+    ["--need", "q", "eval", "--metric", "m"],
+    ["--need", "n", "eval", "--k", "9"],
+    ["--need", "q", "eval", "--bogus"],
+    ["--need", "q", "--scale", "x"],
+    ["--set", "scale", "5"],
+    ["--set", "train.lr", "0.3"],
+    ["--set", "eval.k", "3"],
+    ["--set", "nope", "1"],
+    ["--set", "need", "true"],
+    ["--set", "mode", "b"],
+    ["--set", "scale", "5", "--need", "w"],
+    ["--set", "train.epochs", "7", "--need", "w", "train", "--req2", "a"],
+    ["--need", "x", "train", "--set", "train.lr", "3", "P"],
+    ["--reset", "scale"],
+    ["--reset", "need"],
+    ["--reset_all"],
+]
+
+
+def run(tmp_path, monkeypatch, build, config, argv, **kwargs) -> dict:
+    """parses argv with a fresh config, returning the namespace or exit code, stderr, and the saved config"""
+    path = tmp_path / f"{len(list(tmp_path.iterdir()))}.json"
+    path.write_text(json.dumps(config))
+    monkeypatch.setattr(sys, "argv", ["prog", *argv])
+    stderr = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(stderr):
+            result = {"namespace": vars(ArgparseConfig(build(), str(path), **kwargs).parse_args())}
+    except SystemExit as e:
+        result = {"exit": e.code}
+    result["stderr"] = stderr.getvalue()
+    result["config"] = json.loads(path.read_text())
+    return result
+
+
+@pytest.mark.parametrize("exit_on_change", [False, True])
+@pytest.mark.parametrize("argv", ARGVS, ids=" ".join)
+@pytest.mark.parametrize("config", CONFIGS, ids=json.dumps)
+@pytest.mark.parametrize("build", [nested_parser, default_command_parser])
+def test_same_as_default_mode(tmp_path, monkeypatch, build, config, argv, exit_on_change):
+    expected = run(tmp_path, monkeypatch, build, config, argv, exit_on_change=exit_on_change)
+    actual = run(tmp_path, monkeypatch, build, config, argv, exit_on_change=exit_on_change, single_pass=True)
+    assert actual == expected
+
+
+@pytest.mark.parametrize("config", [{}, {"train": {"req": "r"}}, {"train": {"pos": "P"}}], ids=json.dumps)
+def test_default_command_missing_required(tmp_path, monkeypatch, config):
+    # the default subcommand isn't parsed, so its required arguments have to come from the config
+    expected = run(tmp_path, monkeypatch, required_default_command_parser, config, [])
+    actual = run(tmp_path, monkeypatch, required_default_command_parser, config, [], single_pass=True)
+    assert expected["exit"] == actual["exit"] == 2
+    assert actual["stderr"] == expected["stderr"]
+
+
+def test_default_command_from_config(tmp_path, monkeypatch):
+    config = {"train": {"req": "r", "pos": "P"}}
+    expected = run(tmp_path, monkeypatch, required_default_command_parser, config, [])
+    actual = run(tmp_path, monkeypatch, required_default_command_parser, config, [], single_pass=True)
+    assert actual == expected
+    assert actual["namespace"]["pos"] == "P"
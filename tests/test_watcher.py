@@ -0,0 +1,21 @@
+"""Reloading a watched CfgDict after its file was edited by something else."""
+import json
+
+from cfg_param_wrapper import CfgDict
+from cfg_param_wrapper.watcher import ConfigWatcher
+
+
+def test_check_reports_removed_keys(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"a": 2, "b": 3, "z": 1}))
+    cfg = CfgDict(path)
+    cfg.load()
+    watcher = ConfigWatcher(cfg)
+    seen = []
+    watcher.on_change(lambda cfg, changes: seen.append(changes))
+    cfg["b"] = 4  # unsaved, so it is kept
+
+    path.write_text(json.dumps({"z": 5}))
+    assert watcher.check() == {"a": (2, None), "z": (1, 5)}
+    assert seen == [{"a": (2, None), "z": (1, 5)}]
+    assert dict(cfg) == {"b": 4, "z": 5}
@@ -0,0 +1,81 @@
+"""Wrapped functions have to see every change to their CfgDict."""
+import json
+
+import pytest
+
+from cfg_param_wrapper import CfgDict, wrap_config
+
+
+def set_item(cfg):
+    cfg["a"] = 2
+
+
+def update(cfg):
+    cfg.update({"a": 2})
+
+
+def update_in_place(cfg):
+    cfg |= {"a": 2}
+
+
+def setdefault(cfg):
+    del cfg["a"]
+    cfg.setdefault("a", 2)
+
+
+def pop(cfg):
+    cfg.pop("a")
+
+
+def delete(cfg):
+    del cfg["a"]
+
+
+def clear(cfg):
+    cfg.clear()
+
+
+def popitem(cfg):
+    cfg.popitem()
+
+
+def batch(cfg):
+    with cfg.batch():
+        cfg["a"] = 2
+
+
+def load(cfg):
+    cfg.save_handler.path.write_text(json.dumps({"a": 2}))
+    cfg.load(force=True)
+
+
+@pytest.mark.parametrize(
+    "mutate", [set_item, update, update_in_place, setdefault, pop, delete, clear, popitem, batch, load]
+)
+@pytest.mark.parametrize("concurrent", [False, True])
+def test_wrapped_function_sees_changes(tmp_path, mutate, concurrent):
+    cfg = CfgDict(tmp_path / "config.json", {"a": 3}, concurrent=concurrent)
+
+    @wrap_config(cfg)
+    def f(a=1):
+        return a
+
+    assert f() == 3
+    mutate(cfg)
+    assert f() == (2 if "a" in cfg else 1)
+
+
+@pytest.mark.parametrize("save_mode", ["json", "toml"])
+def test_startup_saves_once(tmp_path, save_mode):
+    path = tmp_path / f"config.{save_mode}"
+    stats = []
+    for _ in range(3):
+        cfg = CfgDict(path, save_mode=save_mode)
+
+        @wrap_config(cfg)
+        def f(a=1, b=None):
+            return a, b
+
+        assert f() == (1, None)
+        stats.append(path.stat().st_mtime_ns)
+    assert stats[0] == stats[1] == stats[2]